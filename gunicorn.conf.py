@@ -0,0 +1,9 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+"""
+
+
+def worker_exit(server, worker):
+    # Don't lose views buffered by this worker
+    from jobs import counters
+    counters.flush()
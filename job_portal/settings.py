@@ -39,11 +39,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.humanize',
 
     'jobs',
 ]
 
 MIDDLEWARE = [
+    'jobs.middleware.RequestMetricsMiddleware',  # First, so its timings include the other middleware
+    'jobs.middleware.ReplicaMiddleware',  # Before sessions, so session writes pin to the primary too
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,7 +61,8 @@ ROOT_URLCONF = 'job_portal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for the request metrics
+        'BACKEND': 'jobs.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'jobs.context_processors.fragment_cache',
             ],
         },
     },
@@ -80,9 +85,36 @@ WSGI_APPLICATION = 'job_portal.wsgi.application'
 # Use PostgreSQL if DATABASE_URL is set (production), otherwise SQLite (development)
 if config('DATABASE_URL', default=None):
     import dj_database_url
+    from importlib.util import find_spec
+
     DATABASES = {
-        'default': dj_database_url.config(default=config('DATABASE_URL'), conn_max_age=600)
+        'default': dj_database_url.config(
+            default=config('DATABASE_URL'),
+            # Without the pool, connections persist per thread for this many
+            # seconds; use 0 under ASGI, where each request runs its queries
+            # on a different thread
+            conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
+            # Ping reused connections before a request's first query, so one
+            # dropped by the server or a proxy is replaced instead of erroring
+            conn_health_checks=config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        )
     }
+    # Native connection pool, on by default with psycopg 3 and psycopg[pool]
+    # installed (psycopg2 falls back to the persistent connections above).
+    # Each worker process holds DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections
+    # and requests borrow one, so Postgres sees at most
+    # workers * DB_POOL_MAX_SIZE connections
+    DB_POOL = DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and config(
+        'DB_POOL', default=bool(find_spec('psycopg') and find_spec('psycopg_pool')), cast=bool,
+    )
+    if DB_POOL:
+        DATABASES['default']['CONN_MAX_AGE'] = 0  # Pooled connections go back to the pool instead
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),  # seconds to wait for a free connection
+            'max_idle': config('DB_POOL_MAX_IDLE', default=600, cast=int),  # seconds before closing a spare one
+        }
 else:
     DATABASES = {
         'default': {
@@ -91,7 +123,54 @@ else:
         }
     }
 
-
+# Read replicas, as database URLs separated by commas. They become
+# replica_1, replica_2... with the primary's connection settings; listing and
+# search pages read from them (see jobs/replicas.py)
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+for number, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    import dj_database_url
+    primary = DATABASES['default']
+    replica = dj_database_url.parse(
+        url, conn_max_age=primary.get('CONN_MAX_AGE', 0), conn_health_checks=primary.get('CONN_HEALTH_CHECKS', False),
+    )
+    if 'pool' in primary.get('OPTIONS', {}) and replica['ENGINE'] == primary['ENGINE']:
+        replica.setdefault('OPTIONS', {})['pool'] = dict(primary['OPTIONS']['pool'])
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{number}'] = replica
+
+DATABASE_ROUTERS = ['jobs.replicas.ReplicaRouter']
+# After a request writes, that browser reads from the primary for this long (replication lag)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+
+
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+# 'default' is shared by all workers: Redis when REDIS_URL is set, otherwise
+# CACHE_BACKEND=db (a table created by migrate, the production default) or
+# locmem (per process, the development default). Running more than one web
+# worker (WEB_CONCURRENCY) requires a shared one, Redis or db; see
+# jobs/checks.py. There is no file cache: its add() isn't atomic, so it
+# can't lock, and every write lists the whole cache directory. 'local' is the small per-process LRU that
+# jobs/caching.py keeps in front of it
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_BACKEND = config('CACHE_BACKEND', default='redis' if REDIS_URL else ('locmem' if DEBUG else 'db'))
+SHARED_CACHE_BACKENDS = {
+    'redis': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'jobs_cache'},
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jobs-shared'},
+}
+CACHES = {
+    'default': {**SHARED_CACHE_BACKENDS[CACHE_BACKEND], 'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='jobportal')},
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jobs-local',
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=1000, cast=int)},
+    },
+}
+# Seconds a process keeps its own copy of a shared value
+CACHE_LOCAL_TIMEOUT = config('CACHE_LOCAL_TIMEOUT', default=5, cast=int)
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -135,6 +214,15 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads stream to temporary files. The apply view adds
+# jobs.resumes.ResumeUploadHandler in front, which size/type checks resumes
+# while streaming; they are stored by content hash
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+RESUME_MAX_UPLOAD_SIZE = config('RESUME_MAX_UPLOAD_SIZE', default=5 * 1024 * 1024, cast=int)  # bytes
+RESUME_ALLOWED_EXTENSIONS = ('.pdf', '.doc', '.docx')
+
 # Email Configuration
 if DEBUG:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -148,8 +236,78 @@ else:
 
 DEFAULT_FROM_EMAIL = config('EMAIL_HOST_USER', default='noreply@jobportal.com')
 
+# Email outbox: notifications are queued and sent by `manage.py send_queued_emails`
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)  # seconds, doubles per attempt
+EMAIL_OUTBOX_LEASE = 600  # seconds a worker may hold a batch before it is retried
+
 # Pagination
 ITEMS_PER_PAGE = 6
+PAGINATION_COUNT_CACHE_TIMEOUT = config('PAGINATION_COUNT_CACHE_TIMEOUT', default=60, cast=int)  # "N total" counts
+
+# Job view counter: views are buffered and written back in batches
+# 'local' buffers per process, 'cache' shares the buffer through the cache
+VIEW_COUNTER_BACKEND = config('VIEW_COUNTER_BACKEND', default='local')
+VIEW_COUNTER_FLUSH_INTERVAL = config('VIEW_COUNTER_FLUSH_INTERVAL', default=10, cast=int)  # seconds
+VIEW_COUNTER_MAX_PENDING = config('VIEW_COUNTER_MAX_PENDING', default=1000, cast=int)
+
+# Homepage filter facets are adjusted in place on job changes; the timeout
+# only bounds drift from concurrent updates
+FACETS_CACHE_TIMEOUT = config('FACETS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Cached template fragments (job cards, company details); 0 disables them
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Trending / newest job leaderboards (dashboard, homepage, /api/leaderboards/)
+LEADERBOARD_SIZE = config('LEADERBOARD_SIZE', default=10, cast=int)
+POPULAR_HALF_LIFE_HOURS = config('POPULAR_HALF_LIFE_HOURS', default=24, cast=float)  # a view counts half after this
+POPULAR_WINDOW_DAYS = config('POPULAR_WINDOW_DAYS', default=7, cast=int)  # daily views older than this are ignored
+LEADERBOARD_REBUILD_INTERVAL = config('LEADERBOARD_REBUILD_INTERVAL', default=3600, cast=int)  # seconds
+
+# "Other jobs at this company" on job pages, cached per company and dropped
+# when one of its jobs changes
+RELATED_JOBS_CACHE_TIMEOUT = config('RELATED_JOBS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Admin changelists for big tables: estimate totals above ADMIN_EXACT_COUNT_LIMIT
+# rows from the PostgreSQL planner instead of running COUNT(*)
+ADMIN_PERFORMANCE_MODE = config('ADMIN_PERFORMANCE_MODE', default=True, cast=bool)
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
+# Rows fetched per round trip by the streaming applicant export
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Each user's bookmarked and applied job ids, for marking listing cards;
+# updated in place on every bookmark and application
+USER_JOBS_CACHE_TIMEOUT = config('USER_JOBS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Full-page cache for anonymous visitors, seconds per view (0 disables)
+PAGE_CACHE_TIMEOUTS = {
+    'index': config('PAGE_CACHE_INDEX_TIMEOUT', default=60, cast=int),
+    'job_detail': config('PAGE_CACHE_JOB_DETAIL_TIMEOUT', default=300, cast=int),
+    'company_detail': config('PAGE_CACHE_COMPANY_DETAIL_TIMEOUT', default=300, cast=int),
+}
+
+# Per-request metrics (jobs.middleware): Server-Timing headers, a DEBUG log line
+# per request on the 'jobs.metrics' logger (REQUEST_LOG_LEVEL=DEBUG shows them)
+# and Prometheus histograms at /metrics/
+REQUEST_METRICS_SERVER_TIMING = config('REQUEST_METRICS_SERVER_TIMING', default=True, cast=bool)
+REQUEST_METRICS_PUBLISH_INTERVAL = config('REQUEST_METRICS_PUBLISH_INTERVAL', default=15, cast=int)  # seconds
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # /metrics/ requires "Authorization: Bearer <token>"; without one it is 404 unless DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'jobs.metrics': {
+            'handlers': ['console'],
+            'level': config('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # Authentication
 LOGIN_URL = 'jobs:login'
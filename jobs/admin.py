@@ -1,5 +1,49 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Company, Job, Application, Bookmark, UserProfile
+from . import search, triage, user_jobs
+from .models import (
+    Company, Job, Application, ApplicationStatusChange, Bookmark, UserProfile, OutboundEmail, CompanyStats,
+)
+from .pagination import EstimatedCountPaginator
+
+
+def _performance_mode():
+    return getattr(settings, 'ADMIN_PERFORMANCE_MODE', True)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist for tables with millions of rows. In performance mode
+    (ADMIN_PERFORMANCE_MODE) big totals are estimated rather than counted,
+    and the unfiltered total isn't shown next to filtered results.
+    """
+    
+    @property
+    def show_full_result_count(self):
+        return not _performance_mode()
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if _performance_mode():
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+
+class JobSearchAdmin(LargeTableAdmin):
+    """
+    Searches jobs through the full-text index (title, company, location,
+    description, requirements), plus exact matches on search_fields, instead
+    of icontains over joined tables.
+    """
+    # From this model to Job; '' for Job itself
+    job_lookup = 'job'
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        exact, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matching_jobs = search.filter_jobs(Job.objects.all(), search_term).values('pk')
+        lookup = f'{self.job_lookup}__in' if self.job_lookup else 'pk__in'
+        return exact | queryset.filter(**{lookup: matching_jobs}), may_have_duplicates
 
 
 @admin.register(UserProfile)
@@ -8,6 +52,8 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('is_employer', 'created_date')
     search_fields = ('user__username', 'user__email', 'company__name')
     readonly_fields = ('user', 'created_date')
+    list_select_related = ('user', 'company')
+    autocomplete_fields = ('company',)
 
 
 @admin.register(Company)
@@ -18,11 +64,23 @@ class CompanyAdmin(admin.ModelAdmin):
     ordering = ('-created_date',)
 
 
+@admin.register(CompanyStats)
+class CompanyStatsAdmin(admin.ModelAdmin):
+    list_display = ('company', 'active_jobs', 'total_applications', 'total_views', 'updated_date')
+    search_fields = ('company__name',)
+    readonly_fields = ('company', 'active_jobs', 'total_applications', 'total_views', 'updated_date')
+    list_select_related = ('company',)
+
+
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
+class JobAdmin(JobSearchAdmin):
     list_display = ('title', 'company', 'location', 'job_type', 'experience_level', 'posted_by', 'posted_date', 'is_active', 'views_count')
-    list_filter = ('job_type', 'experience_level', 'is_active', 'posted_date', 'company')
-    search_fields = ('title', 'company__name', 'location', 'description', 'posted_by__username')
+    # No company filter: it lists every company; search by company name instead
+    list_filter = ('job_type', 'experience_level', 'is_active', 'posted_date')
+    search_fields = ('=posted_by__username',)
+    job_lookup = ''
+    list_select_related = ('company', 'posted_by')
+    autocomplete_fields = ('company',)
     readonly_fields = ('views_count', 'posted_date', 'posted_by')
     fieldsets = (
         ('Basic Info', {
@@ -46,11 +104,33 @@ class JobAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+def _status_action(status, label):
+    """Admin action moving the selected applications to status"""
+    def action(modeladmin, request, queryset):
+        changed = triage.change_status(queryset, status, changed_by=request.user)
+        modeladmin.message_user(request, f'{changed} application(s) moved to {label}.')
+    action.__name__ = f'move_to_{status.lower()}'
+    return admin.action(description=f'Move selected applications to {label}')(action)
+
+
+class StatusChangeInline(admin.TabularInline):
+    model = ApplicationStatusChange
+    fields = ('old_status', 'new_status', 'changed_by', 'changed_date')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Application)
-class ApplicationAdmin(admin.ModelAdmin):
+class ApplicationAdmin(JobSearchAdmin):
     list_display = ('user', 'job', 'status', 'applied_date', 'updated_date')
-    list_filter = ('status', 'applied_date', 'job__company')
-    search_fields = ('user__username', 'user__email', 'job__title')
+    list_filter = ('status', 'applied_date')
+    search_fields = ('=user__username', '=user__email')
+    list_select_related = ('user', 'job', 'job__company')
+    autocomplete_fields = ('job', 'user')
     readonly_fields = ('applied_date', 'updated_date', 'resume')
     fieldsets = (
         ('Application', {
@@ -64,13 +144,48 @@ class ApplicationAdmin(admin.ModelAdmin):
         }),
     )
     ordering = ('-applied_date',)
+    inlines = [StatusChangeInline]
+    # One UPDATE per action; applicants are emailed through the outbox
+    actions = [_status_action(status, label) for status, label in Application.STATUS_CHOICES]
+    
+    def save_model(self, request, obj, form, change):
+        if change and 'status' in form.changed_data:
+            triage.change_status(Application.objects.filter(pk=obj.pk), obj.status, changed_by=request.user)
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(Bookmark)
-class BookmarkAdmin(admin.ModelAdmin):
+class BookmarkAdmin(JobSearchAdmin):
     list_display = ('user', 'job', 'created_date')
-    list_filter = ('created_date', 'job__company')
-    search_fields = ('user__username', 'job__title')
+    list_filter = ('created_date',)
+    search_fields = ('=user__username',)
+    list_select_related = ('user', 'job', 'job__company')
+    autocomplete_fields = ('job', 'user')
     readonly_fields = ('created_date',)
     ordering = ('-created_date',)
+    
+    # Bookmark deletes send no signal to jobs.user_jobs (see jobs/signals.py)
+    def save_model(self, request, obj, form, change):
+        if change:
+            user_jobs.invalidate(Bookmark.objects.get(pk=obj.pk).user_id)
+            user_jobs.invalidate(obj.user_id)
+        super().save_model(request, obj, form, change)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        user_jobs.invalidate(obj.user_id)
+    
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            user_jobs.invalidate(user_id)
+
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_date', 'sent_date')
+    list_filter = ('status', 'created_date')
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_date', 'sent_date', 'last_error')
+    ordering = ('-created_date',)
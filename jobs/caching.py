@@ -0,0 +1,269 @@
+"""
+Two-tier cache for the jobs app.
+
+Values live in the shared ``default`` cache (Redis, or the database cache;
+see CACHES in settings) and are copied into a small per-process LRU, the
+``local`` cache, for ``CACHE_LOCAL_TIMEOUT`` seconds. A hot key is then read
+from process memory instead of over the network on every request. Deleting a
+key clears the shared copy and this process's copy; other processes may serve
+theirs until it expires, so only cache data that can be a few seconds stale.
+
+Keys are grouped in namespaces, and each namespace has a version that is
+part of every key::
+
+    job_lists = Namespace('job-lists', timeout=60)
+    jobs = job_lists.get_or_set('popular', lambda: list(...))
+    job_lists.invalidate()  # Every key of the namespace, at once
+
+``get_or_set`` protects expensive values from stampedes. When a value expires
+one caller recomputes it while the others keep serving the previous value
+for up to another ``timeout``. When there is no value at all, the others
+wait up to ``LOCK_WAIT`` seconds for the first caller instead of all running
+the same query. The lock is a cache ``add()``.
+
+Lookups are counted per namespace (see ``stats``) and exported on /metrics/.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Longest a caller waits for another one to compute a missing value
+LOCK_WAIT = 5.0
+# Lock expiry, in case its holder dies mid-computation
+LOCK_TIMEOUT = 30
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(namespace, result):
+    with _stats_lock:
+        _stats[(namespace, result)] += 1
+
+
+def stats():
+    """Lookups in this process: ``{(namespace, result): count}``"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _shared():
+    return caches['default']
+
+
+def _local():
+    return caches['local'] if 'local' in settings.CACHES else None
+
+
+class Namespace:
+    """
+    A group of keys that share a timeout and can be invalidated together.
+
+    ``timeout`` is in seconds, or a callable returning it so settings are read
+    when a value is stored.
+    """
+
+    def __init__(self, name, timeout=300):
+        self.name = name
+        self._timeout = timeout
+
+    @property
+    def timeout(self):
+        return self._timeout() if callable(self._timeout) else self._timeout
+
+    @property
+    def local_timeout(self):
+        return getattr(settings, 'CACHE_LOCAL_TIMEOUT', 5)
+
+    # ==================== Keys ====================
+
+    def _version_key(self):
+        return f'jobs:ns:{self.name}'
+
+    def version(self):
+        key = self._version_key()
+        local = _local()
+        version = local.get(key) if local is not None else None
+        if version is None:
+            shared = _shared()
+            version = shared.get(key)
+            if version is None:
+                shared.add(key, 1, None)
+                version = shared.get(key, 1)
+            if local is not None:
+                local.set(key, version, self.local_timeout)
+        return version
+
+    def key(self, key):
+        return f'jobs:{self.name}:v{self.version()}:{key}'
+
+    def invalidate(self):
+        """Drop every key of the namespace by moving to a new version"""
+        key = self._version_key()
+        shared = _shared()
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.add(key, 2, None)
+        local = _local()
+        if local is not None:
+            local.delete(key)
+
+    # ==================== Values ====================
+
+    def _lookup(self, full_key, use_local=True):
+        """The stored (value, refresh_at) entry, trying this process first, and where it was found"""
+        local = _local() if use_local else None
+        if local is not None:
+            entry = local.get(full_key)
+            if entry is not None and entry[1] > time.time():
+                return entry, 'local_hit'
+        entry = _shared().get(full_key)
+        if entry is None:
+            return None, 'miss'
+        if local is not None:
+            local.set(full_key, entry, self.local_timeout)
+        return entry, 'shared_hit'
+
+    def _store(self, full_key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        entry = (value, time.time() + timeout)
+        # Kept for another timeout past its refresh time, to serve while recomputing
+        _shared().set(full_key, entry, timeout * 2)
+        local = _local()
+        if local is not None:
+            local.set(full_key, entry, min(self.local_timeout, timeout))
+
+    def get(self, key, default=None, use_local=True):
+        """
+        The value if it's still fresh. Pass ``use_local=False`` to read the
+        shared copy before changing it in place.
+        """
+        entry, result = self._lookup(self.key(key), use_local)
+        if entry is None or entry[1] <= time.time():
+            _record(self.name, 'miss')
+            return default
+        _record(self.name, result)
+        return entry[0]
+
+    def set(self, key, value, timeout=None):
+        self._store(self.key(key), value, timeout)
+
+    def delete(self, key):
+        full_key = self.key(key)
+        _shared().delete(full_key)
+        local = _local()
+        if local is not None:
+            local.delete(full_key)
+
+    # ==================== Locks ====================
+
+    def _lock(self, full_key):
+        """Take the key's lock; False if another caller holds it"""
+        return _shared().add(f'{full_key}:lock', 1, LOCK_TIMEOUT)
+
+    def _unlock(self, full_key):
+        _shared().delete(f'{full_key}:lock')
+
+    def _claim(self, key):
+        """
+        First step of get_or_set(): (full_key, entry, serve, locked). Serve
+        entry if serve is set; otherwise compute it, holding the lock if locked
+        """
+        full_key = self.key(key)
+        entry, result = self._lookup(full_key)
+        if entry is not None and entry[1] > time.time():
+            _record(self.name, result)
+            return full_key, entry, True, False
+        if self._lock(full_key):
+            _record(self.name, 'miss')
+            return full_key, entry, False, True
+        if entry is not None:
+            # Someone else is refreshing it
+            _record(self.name, 'stale')
+            return full_key, entry, True, False
+        return full_key, None, False, False
+
+    def _compute(self, full_key, compute, timeout, locked):
+        try:
+            value = compute()
+            self._store(full_key, value, timeout)
+            return value
+        finally:
+            if locked:
+                self._unlock(full_key)
+
+    def get_or_set(self, key, compute, timeout=None):
+        """
+        The cached value, or compute() stored, with one caller computing at a
+        time. Async callers use aget_or_set(), which doesn't wait in a thread.
+        """
+        full_key, entry, serve, locked = self._claim(key)
+        if serve:
+            return entry[0]
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = _shared().get(full_key)
+                if entry is not None:
+                    _record(self.name, 'waited')
+                    return entry[0]
+            # The computing caller is too slow or gone
+            _record(self.name, 'miss')
+        return self._compute(full_key, compute, timeout, locked)
+
+    async def aget_or_set(self, key, compute, timeout=None):
+        """
+        Async get_or_set(). compute is synchronous and, like the cache calls,
+        runs in a thread; waiting for another caller happens on the event
+        loop, so it doesn't hold up the other requests' sync_to_async calls.
+        """
+        full_key, entry, serve, locked = await sync_to_async(self._claim)(key)
+        if serve:
+            return entry[0]
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await sync_to_async(_shared().get)(full_key)
+                if entry is not None:
+                    _record(self.name, 'waited')
+                    return entry[0]
+            _record(self.name, 'miss')
+        return await sync_to_async(self._compute)(full_key, compute, timeout, locked)
+
+    def update(self, key, change):
+        """
+        Replace the shared value with change(value), keeping its refresh time.
+        Does nothing when there is no value; the next get_or_set computes it.
+        If another caller holds the key's lock for too long, the value is
+        dropped instead, so a change is never lost.
+        """
+        full_key = self.key(key)
+        shared = _shared()
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self._lock(full_key):
+            if time.monotonic() >= deadline:
+                self.delete(key)
+                return
+            time.sleep(0.01)
+        try:
+            entry = shared.get(full_key)
+            if entry is None:
+                return
+            value, refresh_at = entry
+            remaining = max(refresh_at - time.time(), 1)
+            new_entry = (change(value), time.time() + remaining)
+            shared.set(full_key, new_entry, remaining + self.timeout)
+            local = _local()
+            if local is not None:
+                local.set(full_key, new_entry, min(self.local_timeout, remaining))
+        finally:
+            self._unlock(full_key)
@@ -0,0 +1,36 @@
+"""
+System checks for the shared cache the jobs app relies on.
+"""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+def _web_workers():
+    try:
+        return int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        return 1
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    backend = getattr(settings, 'CACHE_BACKEND', None)
+    if backend is None:
+        return errors
+    # Redis and the database cache are shared between processes; locmem isn't
+    if _web_workers() > 1 and backend == 'locmem':
+        errors.append(Error(
+            f'WEB_CONCURRENCY is {_web_workers()} but CACHE_BACKEND is {backend!r}.',
+            hint='Each web worker would have its own cache; set REDIS_URL or CACHE_BACKEND=db.',
+            id='jobs.E001',
+        ))
+    if getattr(settings, 'VIEW_COUNTER_BACKEND', 'local') == 'cache' and backend != 'redis':
+        errors.append(Error(
+            f'VIEW_COUNTER_BACKEND is \'cache\' but CACHE_BACKEND is {backend!r}.',
+            hint='Buffered view counts need atomic increments; set REDIS_URL or use VIEW_COUNTER_BACKEND=local.',
+            id='jobs.E002',
+        ))
+    return errors
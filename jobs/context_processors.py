@@ -0,0 +1,6 @@
+from . import fragments
+
+
+def fragment_cache(request):
+    """Timeout for the {% cache %} fragments in the jobs templates"""
+    return {'fragment_cache_timeout': fragments.timeout()}
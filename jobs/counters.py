@@ -0,0 +1,225 @@
+"""
+Write-behind job view counter.
+
+``job_detail`` used to run an ``UPDATE`` on the job row for every page view,
+which serializes popular postings behind row locks (and SQLite behind its
+database-wide write lock). Views are now aggregated per job and written back
+in batches: one ``UPDATE ... SET views_count = views_count + CASE ...`` per
+flush interval.
+
+Two stores are available, chosen with ``VIEW_COUNTER_BACKEND``:
+
+* ``local`` - a per-process dict. Each gunicorn worker flushes its own buffer.
+* ``cache`` - the default Django cache, shared by every worker using it.
+  Requires a backend with atomic ``incr``/``decr`` (Redis, Memcached).
+
+Pending counts are flushed once the interval elapses or too many jobs are
+pending - checked when a request has finished, so the write never delays a
+response - and at process exit. ``manage.py flush_view_counts`` can only
+reach the ``cache`` store; a ``local`` buffer lives in its worker.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from . import leaderboards, stats
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Largest number of jobs updated by a single statement
+UPDATE_BATCH_SIZE = 500
+
+
+class LocalStore:
+    """Pending view counts held in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add(self, job_id, count=1):
+        with self._lock:
+            self._pending[job_id] = self._pending.get(job_id, 0) + count
+
+    def pending(self):
+        return len(self._pending)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class CacheStore:
+    """
+    Pending view counts held in the shared cache.
+
+    Each job has a counter key. Job ids are registered in numbered slots when
+    their counter goes from 0 to 1, so a flush only has to look at slots
+    written since the previous one.
+    """
+    prefix = 'viewcounts'
+
+    def _count_key(self, job_id):
+        return f'{self.prefix}:n:{job_id}'
+
+    def _slot_key(self, slot):
+        return f'{self.prefix}:slot:{slot}'
+
+    def _incr(self, key, delta=1):
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            return cache.incr(key, delta)
+
+    def _register(self, job_id):
+        slot = self._incr(f'{self.prefix}:seq')
+        cache.set(self._slot_key(slot), job_id, timeout=None)
+
+    def add(self, job_id, count=1):
+        if self._incr(self._count_key(job_id), count) == count:
+            self._register(job_id)
+
+    def pending(self):
+        return cache.get(f'{self.prefix}:seq', 0) - cache.get(f'{self.prefix}:flushed', 0)
+
+    def drain(self):
+        lock_key = f'{self.prefix}:lock'
+        if not cache.add(lock_key, 1, timeout=60):
+            return {}  # Another worker is flushing
+        try:
+            flushed = cache.get(f'{self.prefix}:flushed', 0)
+            seq = cache.get(f'{self.prefix}:seq', 0)
+            slot_keys = [self._slot_key(slot) for slot in range(flushed + 1, seq + 1)]
+            job_ids = set(cache.get_many(slot_keys).values())
+
+            pending = {}
+            for job_id in job_ids:
+                count = cache.get(self._count_key(job_id), 0)
+                if not count:
+                    continue
+                pending[job_id] = count
+                # Views recorded while draining keep the id registered
+                if cache.decr(self._count_key(job_id), count) > 0:
+                    self._register(job_id)
+
+            cache.delete_many(slot_keys)
+            cache.set(f'{self.prefix}:flushed', seq, timeout=None)
+            return pending
+        finally:
+            cache.delete(lock_key)
+
+
+def write_counts(pending):
+    """
+    Add pending view counts to the Job table, company totals and daily views,
+    batched. Each batch commits on its own; returns the counts of the batch
+    that failed and those after it (empty if all were written), to be retried.
+    """
+    items = sorted(pending.items())
+    written, unwritten = pending, {}
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        batch = items[start:start + UPDATE_BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk__in=[job_id for job_id, _ in batch]).update(
+                    views_count=F('views_count') + Case(
+                        *[When(pk=job_id, then=Value(count)) for job_id, count in batch],
+                        default=Value(0),
+                    )
+                )
+                stats.add_views(dict(batch))
+                leaderboards.record_daily_views(dict(batch))
+        except Exception:
+            logger.exception('Failed to write %d job view counts', len(items) - start)
+            written, unwritten = dict(items[:start]), dict(items[start:])
+            break
+    if written:
+        try:
+            leaderboards.add_views(written)
+        except Exception:
+            # Written already, so not retried; the board catches up when rebuilt
+            logger.exception('Failed to add %d job view counts to the popular jobs board', len(written))
+        try:
+            leaderboards.prune_daily_views()
+        except Exception:
+            logger.exception('Failed to prune old daily job views')
+    return unwritten
+
+
+class ViewCounter:
+    """Buffers job views and flushes them in batches"""
+
+    def __init__(self, store, interval, max_pending):
+        self.store = store
+        self.interval = interval
+        self.max_pending = max_pending
+        self._last_flush = time.monotonic()
+        self._recorded = False
+
+    def record(self, job_id):
+        """Count a view; it is written by a later flush"""
+        self.store.add(job_id)
+        self._recorded = True
+
+    def flush_if_due(self):
+        """Flush if views were recorded and the interval elapsed or too many are pending"""
+        if self._recorded and (time.monotonic() - self._last_flush >= self.interval
+                               or self.store.pending() >= self.max_pending):
+            self.flush()
+
+    def flush(self):
+        """Write all pending counts; returns the number of jobs updated"""
+        self._last_flush = time.monotonic()
+        self._recorded = False
+        pending = self.store.drain()
+        if not pending:
+            return 0
+        unwritten = write_counts(pending)
+        # Batches that committed are not put back, or the next flush would count them twice
+        for job_id, count in unwritten.items():
+            self.store.add(job_id, count)
+        if unwritten:
+            self._recorded = True
+        return len(pending) - len(unwritten)
+
+
+_counter = None
+
+
+def get_counter():
+    """Return the process-wide ViewCounter configured from settings"""
+    global _counter
+    if _counter is None:
+        backend = getattr(settings, 'VIEW_COUNTER_BACKEND', 'local')
+        store = CacheStore() if backend == 'cache' else LocalStore()
+        _counter = ViewCounter(
+            store,
+            interval=getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10),
+            max_pending=getattr(settings, 'VIEW_COUNTER_MAX_PENDING', 1000),
+        )
+        atexit.register(_counter.flush)
+    return _counter
+
+
+def record_view(job_id):
+    get_counter().record(job_id)
+
+
+def flush():
+    return get_counter().flush()
+
+
+def flush_if_due():
+    """Called after each request; a no-op in processes that recorded no views"""
+    if _counter is not None:
+        _counter.flush_if_due()
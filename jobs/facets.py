@@ -0,0 +1,112 @@
+"""
+Cached filter facets for the homepage.
+
+The job type, experience level and location filters show every value with
+its number of active jobs. The counts are computed once with a GROUP BY per
+field, cached, and then adjusted in place by the Job signals instead of being
+recomputed on every page view.
+"""
+from django.conf import settings
+from django.db.models import Count
+
+from . import replicas
+from .caching import Namespace
+from .models import Job
+
+FACET_FIELDS = ('job_type', 'experience_level', 'location')
+
+# Job state a facet count depends on, read before a job is saved
+STATE_FIELDS = ('is_active',) + FACET_FIELDS
+
+
+def _timeout():
+    return getattr(settings, 'FACETS_CACHE_TIMEOUT', 3600)
+
+
+_cache = Namespace('facets', timeout=_timeout)
+
+
+def compute_counts():
+    """Count active jobs per value of every facet field"""
+    active = Job.objects.filter(is_active=True).order_by()
+    # Read-only GROUP BYs over the whole table: a replica's work
+    with replicas.reading():
+        return {
+            field: dict(active.values_list(field).annotate(count=Count('id')))
+            for field in FACET_FIELDS
+        }
+
+
+def get_counts():
+    return _cache.get_or_set('counts', compute_counts)
+
+
+def get_facets():
+    """
+    Return the facet lists for the filter form, e.g.
+    ``{'job_type': [{'value': 'Remote', 'label': 'Remote', 'count': 1204}, ...]}``
+    """
+    return _facets(get_counts())
+
+
+async def aget_facets():
+    """Async get_facets()"""
+    return _facets(await _cache.aget_or_set('counts', compute_counts))
+
+
+def _facets(counts):
+    labels = {
+        'job_type': dict(Job.JOB_TYPE_CHOICES),
+        'experience_level': dict(Job.EXPERIENCE_LEVEL_CHOICES),
+    }
+    facets = {}
+    for field in FACET_FIELDS:
+        field_labels = labels.get(field)
+        if field_labels:
+            # Keep the order of the model choices
+            order = list(field_labels)
+            values = sorted(counts[field], key=lambda v: order.index(v) if v in order else len(order))
+        else:
+            values = sorted(counts[field])
+        facets[field] = [
+            {'value': value, 'label': (field_labels or {}).get(value, value), 'count': counts[field][value]}
+            for value in values
+        ]
+    return facets
+
+
+def capture_state(job):
+    """Snapshot of the fields facet counts depend on, or None if any are deferred"""
+    if any(field not in job.__dict__ for field in STATE_FIELDS):
+        return None
+    return tuple(job.__dict__[field] for field in STATE_FIELDS)
+
+
+def apply_change(old_state, new_state):
+    """
+    Move one job from old_state to new_state in the cached counts.
+
+    Either state may be None (job created/deleted). The cache entry is
+    dropped if it can't be updated in place.
+    """
+    if old_state == new_state:
+        return
+
+    def change(counts):
+        for state, delta in ((old_state, -1), (new_state, 1)):
+            if state is None or not state[0]:
+                continue  # Inactive jobs aren't counted
+            for field, value in zip(FACET_FIELDS, state[1:]):
+                total = counts[field].get(value, 0) + delta
+                if total > 0:
+                    counts[field][value] = total
+                else:
+                    counts[field].pop(value, None)
+        return counts
+
+    # Under the key's lock, so concurrent saves can't overwrite each other's change
+    _cache.update('counts', change)
+
+
+def invalidate():
+    _cache.delete('counts')
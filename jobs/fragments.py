@@ -0,0 +1,63 @@
+"""
+Versions for cached template fragments.
+
+Job cards, job detail bodies and company details are wrapped in
+``{% cache %}`` blocks keyed by the object id and a version token. The Job and
+Company signals replace the token on save, so edited objects are re-rendered
+while everything else is served from the cache.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _key(kind, pk):
+    return f'jobs:fragver:{kind}:{pk}'
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def get_versions(kind, pks):
+    """Return {pk: version token}, creating tokens for unknown objects"""
+    keys = {pk: _key(kind, pk) for pk in pks}
+    found = cache.get_many(keys.values())
+    versions, missing = {}, {}
+    for pk, key in keys.items():
+        if key in found:
+            versions[pk] = found[key]
+        else:
+            # A fresh token, never a default: an evicted version must not
+            # make an older fragment reachable again
+            versions[pk] = missing[key] = _new_token()
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def get_version(kind, pk):
+    return get_versions(kind, [pk])[pk]
+
+
+def bump(kind, pk):
+    """Invalidate every fragment rendered from this object"""
+    cache.set(_key(kind, pk), _new_token(), None)
+
+
+def attach_versions(jobs):
+    """
+    Set ``fragment_version`` on each job; it covers the job and its company
+    since job cards show the company name. Returns the jobs.
+    """
+    jobs = list(jobs)
+    job_versions = get_versions('job', [job.pk for job in jobs])
+    company_versions = get_versions('company', {job.company_id for job in jobs})
+    for job in jobs:
+        job.fragment_version = f'{job_versions[job.pk]}.{company_versions[job.company_id]}'
+    return jobs
+
+
+def timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600)
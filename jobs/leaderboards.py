@@ -0,0 +1,294 @@
+"""
+"Trending" and "newest" job leaderboards.
+
+The dashboard, the homepage and /api/leaderboards/ show the top jobs of two
+boards kept in the two-tier cache (jobs.caching), so showing them never sorts
+the Job table:
+
+* ``popular`` ranks active jobs by views with exponential decay: a view counts
+  half as much after ``POPULAR_HALF_LIFE_HOURS``. The view counter flush
+  stores views per job and day (``JobDailyViews``) and adds them to the
+  cached board. The board is rebuilt from the last ``POPULAR_WINDOW_DAYS`` of
+  daily views when it is missing and every ``LEADERBOARD_REBUILD_INTERVAL``
+  seconds, which also evens out jobs that dropped off the candidate list.
+* ``recent`` holds the newest active jobs and is updated by the Job signals.
+
+A score is the log2 of a job's decayed views, measured from a fixed epoch
+instead of from now: a view at time t adds ``2 ** (t / half_life)``. Ranking
+by it equals ranking by the decayed count at any moment, and existing scores
+never have to be rescaled as time passes.
+"""
+import math
+import time
+from datetime import datetime, time as day_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .caching import Namespace
+from .models import Job, JobDailyViews
+
+
+# Scores are seconds since this, over the half-life
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+
+# Fields the cards and the JSON endpoint show
+JOB_FIELDS = ('id', 'title', 'company_id', 'company__name', 'location', 'job_type', 'posted_date', 'views_count')
+
+
+def _size():
+    return getattr(settings, 'LEADERBOARD_SIZE', 10)
+
+
+def _half_life():
+    return getattr(settings, 'POPULAR_HALF_LIFE_HOURS', 24) * 3600
+
+
+def _window():
+    return getattr(settings, 'POPULAR_WINDOW_DAYS', 7)
+
+
+_boards = Namespace('leaderboards', timeout=lambda: getattr(settings, 'LEADERBOARD_REBUILD_INTERVAL', 3600))
+
+
+def _log2_add(a, b):
+    """log2(2**a + 2**b) without overflow"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _jobs(ids):
+    """The active jobs among ids, ready for display, by id"""
+    jobs = Job.objects.filter(pk__in=ids, is_active=True).select_related('company').only(*JOB_FIELDS)
+    return {job.pk: job for job in jobs}
+
+
+# ==================== Popular ====================
+
+def _candidates():
+    # Jobs outside the shown top still gather score, so one can climb into it
+    return max(_size() * 5, 100)
+
+
+def _fill_top(board):
+    """Recompute board['top'] from its scores, loading jobs it doesn't hold yet"""
+    ranked = sorted(board['scores'], key=board['scores'].get, reverse=True)
+    held = {job.pk: job for job in board['top']}
+    top = []
+    while ranked and len(top) < _size():
+        wanted = ranked[:_size() - len(top)]
+        ranked = ranked[len(wanted):]
+        missing = [job_id for job_id in wanted if job_id not in held]
+        if missing:
+            held.update(_jobs(missing))
+        for job_id in wanted:
+            if job_id in held:
+                top.append(held[job_id])
+            else:
+                board['scores'].pop(job_id)  # Deleted or no longer active
+    board['top'] = top
+    return board
+
+
+def build_popular():
+    """Score active jobs from their daily views in the window"""
+    now = time.time()
+    today = timezone.now().date()
+    window = _window()
+    half_life = _half_life()
+    weights = []
+    for age in range(window):
+        day = today - timedelta(days=age)
+        # A day's views count as if made at its midday (or now, for today)
+        moment = min(datetime.combine(day, day_time(12), tzinfo=dt_timezone.utc).timestamp(), now)
+        weights.append(When(day=day, then=Value(2 ** ((moment - now) / half_life))))
+    rows = (
+        JobDailyViews.objects
+        .filter(day__gt=today - timedelta(days=window), job__is_active=True)
+        .values('job')
+        .annotate(score=Sum(F('views') * Case(*weights, default=Value(0.0), output_field=FloatField())))
+        .filter(score__gt=0)
+        .order_by('-score')[:_candidates()]
+    )
+    offset = (now - EPOCH) / half_life
+    scores = {row['job']: math.log2(row['score']) + offset for row in rows}
+    return _fill_top({'scores': scores, 'top': []})
+
+
+def popular(limit=None):
+    """Active jobs with the most recent views, best first"""
+    return _boards.get_or_set('popular', build_popular)['top'][:limit or _size()]
+
+
+async def apopular(limit=None):
+    """Async popular()"""
+    return (await _boards.aget_or_set('popular', build_popular))['top'][:limit or _size()]
+
+
+# The cutoff this process last pruned daily views at
+_pruned_through = None
+
+
+def prune_daily_views(today=None):
+    """
+    Delete daily views older than the window, which no rebuild reads, so the
+    table holds about POPULAR_WINDOW_DAYS rows per viewed job. Runs at most
+    once a day per process (the flush calls it); returns the rows deleted.
+    """
+    global _pruned_through
+    today = today or timezone.now().date()
+    cutoff = today - timedelta(days=_window())
+    if _pruned_through == cutoff:
+        return 0
+    deleted, _ = JobDailyViews.objects.filter(day__lte=cutoff).delete()
+    _pruned_through = cutoff
+    return deleted
+
+
+def record_daily_views(job_counts, day=None):
+    """Add views to today's JobDailyViews rows (inside the flush's transaction)"""
+    day = day or timezone.now().date()
+    job_ids = set(Job.objects.filter(pk__in=list(job_counts)).values_list('pk', flat=True))
+    if not job_ids:
+        return
+    JobDailyViews.objects.bulk_create(
+        [JobDailyViews(job_id=job_id, day=day) for job_id in job_ids], ignore_conflicts=True,
+    )
+    JobDailyViews.objects.filter(day=day, job_id__in=job_ids).update(
+        views=F('views') + Case(
+            *[When(job_id=job_id, then=Value(job_counts[job_id])) for job_id in job_ids],
+            default=Value(0),
+        )
+    )
+
+
+def seed_daily_views(today=None):
+    """
+    When the window holds no daily views at all (e.g. right after the deploy
+    that added them), record the most viewed active jobs' lifetime views on
+    the window's oldest day, so the popular board isn't empty until views
+    accumulate. Being that old, they soon weigh less than new views. Returns
+    the number of jobs seeded.
+    """
+    today = today or timezone.now().date()
+    first_day = today - timedelta(days=_window() - 1)
+    if JobDailyViews.objects.filter(day__gte=first_day).exists():
+        return 0
+    jobs = (
+        Job.objects.filter(is_active=True, views_count__gt=0)
+        .order_by('-views_count').values_list('pk', 'views_count')[:_candidates()]
+    )
+    rows = [JobDailyViews(job_id=job_id, day=first_day, views=views) for job_id, views in jobs]
+    JobDailyViews.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def add_views(job_counts):
+    """Raise the cached scores of jobs that were just viewed"""
+    moment = (time.time() - EPOCH) / _half_life()
+
+    def change(board):
+        for job_id, count in job_counts.items():
+            if count > 0:
+                board['scores'][job_id] = _log2_add(board['scores'].get(job_id), math.log2(count) + moment)
+        # Keep the best candidates
+        board['scores'] = dict(sorted(board['scores'].items(), key=lambda item: item[1], reverse=True)[:_candidates()])
+        return _fill_top(board)
+
+    _boards.update('popular', change)
+
+
+# ==================== Recent ====================
+
+def _recent_capacity():
+    # A few spare, so removing a job rarely means rebuilding
+    return _size() + 10
+
+
+def _newest_first(job):
+    return (job.posted_date, job.pk)
+
+
+def build_recent():
+    jobs = (
+        Job.objects.filter(is_active=True).select_related('company').only(*JOB_FIELDS)
+        .order_by('-posted_date', '-id')[:_recent_capacity()]
+    )
+    return {'top': list(jobs)}
+
+
+def recent(limit=None):
+    """The newest active jobs"""
+    return _boards.get_or_set('recent', build_recent)['top'][:limit or _size()]
+
+
+async def arecent(limit=None):
+    """Async recent()"""
+    return (await _boards.aget_or_set('recent', build_recent))['top'][:limit or _size()]
+
+
+# ==================== Job changes ====================
+
+def job_saved(job):
+    """Update both boards for a created or edited job"""
+    job_id = job.pk
+    shown = None
+    if job.is_active:
+        # Reload with only the shown fields, as the boards keep them
+        shown = _jobs([job_id]).get(job_id)
+
+    def change_popular(board):
+        if job_id not in board['scores']:
+            return board
+        if shown is None:
+            board['scores'].pop(job_id)
+            board['top'] = [other for other in board['top'] if other.pk != job_id]
+            return _fill_top(board)
+        board['top'] = [shown if other.pk == job_id else other for other in board['top']]
+        return board
+
+    def change_recent(board):
+        top = [other for other in board['top'] if other.pk != job_id]
+        if shown is not None:
+            if top and _newest_first(shown) < _newest_first(top[-1]):
+                # Older than all it holds: it belongs in the list only if
+                # the list holds every active job, so reload it
+                return build_recent() if len(top) < _recent_capacity() else {'top': top}
+            top = sorted(top + [shown], key=_newest_first, reverse=True)[:_recent_capacity()]
+        elif len(top) < _size():
+            # Fewer than shown left: load the next ones
+            return build_recent()
+        return {'top': top}
+
+    _boards.update('popular', change_popular)
+    _boards.update('recent', change_recent)
+
+
+def job_deleted(job_id):
+    def change_popular(board):
+        if board['scores'].pop(job_id, None) is None:
+            return board
+        board['top'] = [other for other in board['top'] if other.pk != job_id]
+        return _fill_top(board)
+
+    def change_recent(board):
+        top = [other for other in board['top'] if other.pk != job_id]
+        return build_recent() if len(top) < _size() else {'top': top}
+
+    _boards.update('popular', change_popular)
+    _boards.update('recent', change_recent)
+
+
+def rebuild():
+    """Recompute both boards now"""
+    prune_daily_views()
+    _boards.set('popular', build_popular())
+    _boards.set('recent', build_recent())
+
+
+def invalidate():
+    """Drop both boards; they are rebuilt on the next read"""
+    _boards.invalidate()
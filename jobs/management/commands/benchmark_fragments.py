@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Compare anonymous page render times with and without cached template fragments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Timed requests per page and mode')
+
+    def _time(self, client, url, runs):
+        client.get(url)  # Warm-up, fills the fragment cache when enabled
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        runs = max(options['runs'], 1)
+        job = Job.objects.filter(is_active=True).order_by('-posted_date').first()
+        if job is None:
+            raise CommandError('No active jobs; run populate_jobs first.')
+
+        pages = {
+            'index': reverse('jobs:index'),
+            'job_detail': reverse('jobs:job_detail', args=[job.pk]),
+            'company_detail': reverse('jobs:company_detail', args=[job.company_id]),
+        }
+
+        # Full-page caching off in both modes, or both would time page cache hits.
+        # Nothing is cleared: the shared cache may hold live state (pending view
+        # counts, other pages), and the fragments are filled by the warm-up request
+        no_page_cache = {name: 0 for name in pages}
+        self.stdout.write(f'{"page":<16} {"uncached p50":>14} {"fragments p50":>14}')
+        with override_settings(ALLOWED_HOSTS=['*'], PAGE_CACHE_TIMEOUTS=no_page_cache):
+            client = Client()
+            for name, url in pages.items():
+                with override_settings(FRAGMENT_CACHE_TIMEOUT=0):
+                    uncached = self._time(client, url, runs)
+                cached = self._time(client, url, runs)
+                self.stdout.write(f'{name:<16} {uncached:>12.2f}ms {cached:>12.2f}ms')
@@ -0,0 +1,83 @@
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from jobs import search
+from jobs.models import Company, Job
+
+
+# Jobs per company when --sizes generates companies
+JOBS_PER_COMPANY = 100
+
+DEFAULT_QUERIES = ['python', 'senior developer', 'data engineer', 'remote', 'san francisco', 'kubernetes']
+
+
+class Command(BaseCommand):
+    help = 'Compare search latency of the full-text index against the legacy icontains search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--query', action='append', dest='queries', help='Search term (repeatable)')
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', metavar='JOBS',
+            help=('Benchmark at each of these job counts (e.g. 10000 100000 1000000), generating the '
+                  'missing jobs with populate_jobs; the generated rows are rolled back afterwards'),
+        )
+
+    def _time(self, build_queryset, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            # Fetch the first page, as the index view does
+            list(build_queryset()[:6])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def benchmark(self, queries, runs):
+        active = Job.objects.filter(is_active=True).select_related('company')
+
+        self.stdout.write(f'Active jobs: {active.count()}  runs/query: {runs}')
+        self.stdout.write(f'{"query":<20} {"fts p50":>10} {"fts p95":>10} {"like p50":>10} {"like p95":>10}')
+
+        for query in queries:
+            fts = self._time(lambda: search.filter_jobs(active, query), runs)
+            like = self._time(lambda: active.filter(
+                Q(title__icontains=query) |
+                Q(company__name__icontains=query) |
+                Q(location__icontains=query)
+            ), runs)
+            self.stdout.write(
+                f'{query:<20} {fts[0]:>9.2f}ms {fts[1]:>9.2f}ms {like[0]:>9.2f}ms {like[1]:>9.2f}ms'
+            )
+
+    def grow_to(self, size):
+        """Generate jobs (and companies for them) until the table holds size jobs"""
+        missing = size - Job.objects.count()
+        if missing <= 0:
+            return
+        companies = max(size // JOBS_PER_COMPANY - Company.objects.count(), 0)
+        self.stdout.write(f'Generating {missing} jobs...')
+        call_command('populate_jobs', jobs=missing, companies=companies, seed=size, stdout=StringIO())
+
+    def handle(self, *args, **options):
+        runs = max(options['runs'], 1)
+        queries = options['queries'] or DEFAULT_QUERIES
+        if not options['sizes']:
+            self.benchmark(queries, runs)
+            return
+        if any(size <= 0 for size in options['sizes']):
+            raise CommandError('Sizes must be positive.')
+
+        # Smallest first, each size adding to the jobs of the previous one
+        with transaction.atomic():
+            for size in sorted(set(options['sizes'])):
+                self.stdout.write(f'\n== {size} jobs ==')
+                self.grow_to(size)
+                self.benchmark(queries, runs)
+            transaction.set_rollback(True)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import math
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from jobs.models import Job
+
+
+SERVERS = {
+    # Sync gunicorn workers, as in the Procfile
+    'wsgi': '{python} -m gunicorn job_portal.wsgi:application --workers {workers} --bind 127.0.0.1:{port}',
+    # Gunicorn managing uvicorn workers, see "Running under ASGI" in the README
+    'asgi': ('{python} -m gunicorn job_portal.asgi:application --workers {workers} '
+             '--worker-class uvicorn.workers.UvicornWorker --bind 127.0.0.1:{port}'),
+}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(port, path, cookie):
+    """One GET on a new connection; returns the status code"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        headers = 'Host: localhost\r\nConnection: close\r\n'
+        if cookie:
+            headers += f'Cookie: {cookie}\r\n'
+        writer.write(f'GET {path} HTTP/1.1\r\n{headers}\r\n'.encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # Rest of the response, until the server closes
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def load(port, paths, cookie, concurrency, duration):
+    """concurrency clients requesting paths in turn for duration seconds"""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client(offset):
+        nonlocal errors
+        index = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, paths[index % len(paths)], cookie)
+            except (OSError, ValueError, IndexError):
+                status = None
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+            index += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    return latencies, errors, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = ('Compare request throughput of the sync WSGI server and the ASGI (uvicorn) server '
+            'at increasing numbers of concurrent connections')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100],
+                            help='Concurrent connections, one run per value')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Request as a visitor, mostly served by the page cache')
+        parser.add_argument('--username', help='User to request as (default: the first user)')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def session_cookie(self, username):
+        """A logged-in session cookie, so requests render instead of hitting the page cache"""
+        user = User.objects.filter(username=username).first() if username else User.objects.first()
+        if user is None:
+            raise CommandError('No users; run populate_jobs with --users, or pass --anonymous.')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return f'{settings.SESSION_COOKIE_NAME}={session.session_key}', session
+
+    def paths(self):
+        job = Job.objects.filter(is_active=True).order_by('-posted_date', '-id').first()
+        if job is None:
+            raise CommandError('No active jobs; run populate_jobs first.')
+        return [
+            reverse('jobs:index'),
+            reverse('jobs:index') + '?search=developer',
+            reverse('jobs:job_detail', args=[job.pk]),
+            reverse('jobs:company_detail', args=[job.company_id]),
+            reverse('jobs:dashboard'),
+        ]
+
+    def start_server(self, name, workers):
+        port = free_port()
+        command = SERVERS[name].format(python=shlex.quote(sys.executable), workers=workers, port=port)
+        env = {**os.environ, 'ALLOWED_HOSTS': 'localhost', 'REQUEST_LOG_LEVEL': 'WARNING'}
+        process = subprocess.Popen(
+            shlex.split(command), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{name} server exited: {process.stderr.read().decode()[-2000:]}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                return process, port
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'{name} server did not start within 30s: {command}')
+
+    def handle(self, *args, **options):
+        paths = self.paths()
+        cookie, session = (None, None) if options['anonymous'] else self.session_cookie(options['username'])
+        if options['anonymous']:
+            paths = [path for path in paths if path != reverse('jobs:dashboard')]
+
+        results = []
+        self.stdout.write(f'{"server":<6} {"conns":>6} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}')
+        try:
+            for name in options['servers']:
+                process, port = self.start_server(name, options['workers'])
+                try:
+                    # Warm up caches and connections
+                    asyncio.run(load(port, paths, cookie, 4, 1))
+                    for concurrency in options['concurrency']:
+                        latencies, errors, elapsed = asyncio.run(
+                            load(port, paths, cookie, concurrency, options['duration'])
+                        )
+                        latencies.sort()
+                        result = {
+                            'server': name,
+                            'concurrency': concurrency,
+                            'requests_per_second': round(len(latencies) / elapsed, 1),
+                            'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+                            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+                            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+                            'errors': errors,
+                        }
+                        results.append(result)
+                        self.stdout.write(
+                            f'{name:<6} {concurrency:>6} {result["requests_per_second"]:>9.1f} '
+                            + ' '.join(f'{result[key] or 0:>7.1f}ms' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                            + f' {errors:>7}'
+                        )
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+        finally:
+            if session is not None:
+                session.delete()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'workers': options['workers'], 'paths': paths, 'results': results}, f, indent=2)
+                f.write('\n')
@@ -0,0 +1,216 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Company, Job, Application, Bookmark
+from jobs.pagination import KeysetPaginator
+from jobs.querybudget import QueryRecorder
+
+
+DATASET_OPTIONS = ('companies', 'jobs', 'users', 'applications', 'bookmarks')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the jobs views: p50/p95/p99 latency, queries and allocations per request, '
+            'written to a JSON report that can be compared between commits')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario first')
+        parser.add_argument('--alloc-runs', type=int, default=5,
+                            help='Extra requests per scenario traced with tracemalloc (0 to skip)')
+        parser.add_argument('--only', action='append', help='Run only this scenario (repeatable)')
+        parser.add_argument('--username', help='User for logged-in scenarios (default: one with applications)')
+        parser.add_argument('--output', default='benchmark-report.json', help='Where to write the JSON report')
+        parser.add_argument('--baseline', help='Earlier report to compare against')
+        # Seed a dataset first through populate_jobs
+        for name in DATASET_OPTIONS:
+            parser.add_argument(f'--{name}', type=int, default=0, help=f'{name.capitalize()} to generate first')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the generated dataset')
+
+    # ==================== Scenarios ====================
+
+    def scenarios(self, user):
+        """(name, url, logged_in) for every benchmarked request"""
+        job = Job.objects.filter(is_active=True).order_by('-posted_date', '-id').first()
+        if job is None:
+            raise CommandError('No active jobs; run populate_jobs first or pass --jobs.')
+        # A job the user can still apply to, so apply_job renders the form
+        open_job = Job.objects.filter(is_active=True).exclude(applications__user=user).order_by('-id').first() or job
+        second_page = KeysetPaginator(
+            Job.objects.filter(is_active=True), 6, ('-posted_date', '-id')
+        ).page().next_cursor
+        index = reverse('jobs:index')
+
+        listing = [
+            ('index', ''),
+            ('index_search', '?search=python'),
+            ('index_search_multiword', '?search=senior+engineer'),
+            ('index_job_type', '?job_type=Full-time'),
+            ('index_experience_location', '?experience=Senior&location=San+Francisco'),
+            ('index_salary', '?min_salary=80000&max_salary=150000'),
+            ('index_combined', '?search=developer&job_type=Remote&experience=Mid&min_salary=60000'),
+        ]
+        if second_page:
+            listing.append(('index_page_2', f'?cursor={second_page}'))
+
+        scenarios = []
+        for name, query in listing:
+            scenarios.append((f'{name}_anonymous', index + query, False))
+            scenarios.append((name, index + query, True))
+        scenarios += [
+            ('job_detail_anonymous', reverse('jobs:job_detail', args=[job.pk]), False),
+            ('job_detail', reverse('jobs:job_detail', args=[job.pk]), True),
+            ('company_detail_anonymous', reverse('jobs:company_detail', args=[job.company_id]), False),
+            ('company_detail', reverse('jobs:company_detail', args=[job.company_id]), True),
+            ('dashboard', reverse('jobs:dashboard'), True),
+            ('my_applications', reverse('jobs:my_applications'), True),
+            ('my_bookmarks', reverse('jobs:my_bookmarks'), True),
+            ('toggle_bookmark', reverse('jobs:toggle_bookmark', args=[job.pk]), True),
+            ('apply_job', reverse('jobs:apply_job', args=[open_job.pk]), True),
+        ]
+        return scenarios
+
+    # ==================== Measurement ====================
+
+    def measure(self, client, url, runs, warmup, alloc_runs):
+        for _ in range(warmup):
+            client.get(url)
+
+        timings, queries, statuses = [], [], set()
+        for _ in range(runs):
+            with QueryRecorder() as recorder:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            statuses.add(response.status_code)
+
+        # Separate pass: tracing allocations slows requests down a lot
+        allocations = []
+        if alloc_runs:
+            tracemalloc.start()
+            try:
+                for _ in range(alloc_runs):
+                    before, _ = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                    client.get(url)
+                    _, peak = tracemalloc.get_traced_memory()
+                    allocations.append(peak - before)
+            finally:
+                tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'alloc_peak_kb': round(statistics.median(allocations) / 1024, 1) if allocations else None,
+            'status': sorted(statuses),
+        }
+
+    def metadata(self, options):
+        try:
+            revision = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            revision = None
+        return {
+            'revision': revision,
+            'date': timezone.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'runs': options['runs'],
+            'dataset': {
+                'companies': Company.objects.count(),
+                'jobs': Job.objects.count(),
+                'users': User.objects.count(),
+                'applications': Application.objects.count(),
+                'bookmarks': Bookmark.objects.count(),
+            },
+        }
+
+    def compare(self, results, baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        self.stdout.write(f'\nCompared with {baseline_path}:')
+        self.stdout.write(f'{"scenario":<34} {"p50":>18} {"p95":>18} {"queries":>10}')
+        for name, result in results.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            deltas = []
+            for key in ('p50_ms', 'p95_ms'):
+                change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0
+                deltas.append(f'{old[key]:.1f}→{result[key]:.1f} {change:+4.0f}%')
+            line = f'{name:<34} {deltas[0]:>18} {deltas[1]:>18} {old["queries"]:>4}→{result["queries"]:<4}'
+            regressed = result['queries'] > old['queries'] or result['p95_ms'] > old['p95_ms'] * 1.2
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+    def handle(self, *args, **options):
+        runs = max(options['runs'], 1)
+        if any(options[name] for name in DATASET_OPTIONS):
+            call_command(
+                'populate_jobs', seed=options['seed'], stdout=self.stdout,
+                **{name: options[name] for name in DATASET_OPTIONS},
+            )
+
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(applications__isnull=False).first() or User.objects.first()
+        if user is None:
+            raise CommandError('No users; run populate_jobs with --users first.')
+
+        scenarios = self.scenarios(user)
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario[0] in options['only']]
+
+        results = {}
+        self.stdout.write(f'{"scenario":<34} {"p50":>9} {"p95":>9} {"p99":>9} {"queries":>8} {"alloc":>10}')
+        # Views like toggle_bookmark write; undo everything afterwards
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            anonymous, logged_in = Client(), Client()
+            logged_in.force_login(user)
+            for name, url, authenticated in scenarios:
+                client = logged_in if authenticated else anonymous
+                result = self.measure(client, url, runs, options['warmup'], options['alloc_runs'])
+                results[name] = {'url': url, **result}
+                alloc = f'{result["alloc_peak_kb"]:.0f}KB' if result['alloc_peak_kb'] is not None else '-'
+                self.stdout.write(
+                    f'{name:<34} {result["p50_ms"]:>7.2f}ms {result["p95_ms"]:>7.2f}ms '
+                    f'{result["p99_ms"]:>7.2f}ms {result["queries"]:>8} {alloc:>10}'
+                )
+            transaction.set_rollback(True)
+
+        report = {'meta': self.metadata(options), 'results': results}
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'\nReport written to {options["output"]}'))
+
+        if options['baseline']:
+            self.compare(results, options['baseline'])
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from jobs.querybudget import budget_users, check_role_budgets
+
+
+class Command(BaseCommand):
+    help = ('Request every jobs view, as a job seeker or as the employer it is for, '
+            'and fail if any exceeds its declared query budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Job seeker to log in as (default: the first with applications)')
+        parser.add_argument('--employer', help='Employer to log in as (default: the first with active jobs)')
+
+    def _user(self, username):
+        if username is None:
+            return None
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'No user {username!r}.')
+        return user
+
+    def handle(self, *args, **options):
+        users = budget_users(self._user(options['username']), self._user(options['employer']))
+        if users is None:
+            raise CommandError(
+                'Needs an employer of a company with active jobs and a job seeker with applications; '
+                'run populate_jobs with --users and --applications first.'
+            )
+
+        # Views like toggle_bookmark write; undo everything afterwards
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            results = check_role_budgets(*users)
+            transaction.set_rollback(True)
+
+        failures = []
+        for name, queries, budget, repeated in results:
+            if queries > budget or repeated:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'✗ {name}: {queries} queries (budget {budget})'))
+                for shape, times in repeated.items():
+                    self.stdout.write(f'    {times}x {shape}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}: {queries} queries (budget {budget})'))
+
+        if failures:
+            raise CommandError(f'Over query budget: {", ".join(failures)}')
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from jobs import search
+from jobs.models import Job, Company, Application, Bookmark
+
+
+# Relevance ranking can't come from an index, so search results may be sorted
+UNSORTED_BY_INDEX = {'search'}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot view queries and fail if any of them scans a whole table'
+
+    def hot_queries(self):
+        """Querysets shaped like the ones the views run, keyed by a label"""
+        company_id = Company.objects.values_list('pk', flat=True).first() or 1
+        user_id = User.objects.values_list('pk', flat=True).first() or 1
+        active = Job.objects.filter(is_active=True).select_related('company')
+
+        queries = {
+            'index': active.order_by('-posted_date', '-id')[:7],
+            'company_detail': active.filter(company_id=company_id).order_by('-posted_date', '-id')[:11],
+            'dashboard popular': Job.objects.filter(is_active=True).order_by('-views_count')[:5],
+            'my_applications': Application.objects.filter(user_id=user_id).select_related(
+                'job', 'job__company').order_by('-applied_date', '-id')[:11],
+            'my_bookmarks': Bookmark.objects.filter(user_id=user_id).select_related(
+                'job', 'job__company').order_by('-created_date', '-id')[:11],
+            'applied check': Application.objects.filter(user_id=user_id, job_id=1).order_by(),
+            'bookmark check': Bookmark.objects.filter(user_id=user_id, job_id=1).order_by(),
+        }
+        if search.is_supported():
+            queries['search'] = search.filter_jobs(active, 'python developer')[:7]
+        return queries
+
+    def table_scans(self, plan, sorted_by_index=True):
+        """
+        Lines of an EXPLAIN output that read a whole table. With
+        sorted_by_index, sorting the result set counts too: the index is then
+        only used as a filter and every matching row is read.
+        """
+        scans = []
+        for line in plan.splitlines():
+            if connection.vendor == 'sqlite':
+                if 'SCAN ' in line and not any(ok in line for ok in (
+                        'USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY',
+                        'VIRTUAL TABLE', 'CONSTANT ROW')):
+                    scans.append(line.strip())
+                elif sorted_by_index and 'USE TEMP B-TREE FOR ORDER BY' in line:
+                    scans.append(line.strip())
+            elif 'Seq Scan' in line or (sorted_by_index and line.strip(' ->').startswith('Sort ')):
+                scans.append(line.strip())
+        return scans
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks are not implemented for {connection.vendor}.')
+
+        if connection.vendor == 'postgresql':
+            # Small development tables would be seq-scanned regardless of indexes
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        failures = []
+        for label, queryset in self.hot_queries().items():
+            plan = queryset.explain()
+            scans = self.table_scans(plan, sorted_by_index=label not in UNSORTED_BY_INDEX)
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'✗ {label}: table scan'))
+                for line in scans:
+                    self.stdout.write(f'    {line}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {label}'))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'Table scans in: {", ".join(failures)}')
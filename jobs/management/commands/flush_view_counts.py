@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import counters
+
+
+class Command(BaseCommand):
+    help = 'Write view counts buffered in the shared cache to the database (VIEW_COUNTER_BACKEND=cache)'
+
+    def handle(self, *args, **options):
+        backend = getattr(settings, 'VIEW_COUNTER_BACKEND', 'local')
+        if backend != 'cache':
+            # Each worker holds its own local buffer, which this process can't see
+            raise CommandError(
+                f'VIEW_COUNTER_BACKEND is {backend!r}: pending views are in the web workers\' memory '
+                f'and are flushed by the workers themselves on exit. Only the cache backend can be '
+                f'flushed from here.'
+            )
+        updated = counters.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed view counts for {updated} jobs.'))
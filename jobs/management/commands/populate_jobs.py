@@ -1,12 +1,102 @@
-from django.core.management.base import BaseCommand
-from jobs.models import Company, Job
+import random
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, signals
+from django.utils import timezone
+
+from jobs import facets, leaderboards, page_cache, search, stats
+from jobs.models import Company, Job, JobDailyViews, Application, Bookmark, UserProfile
+
+
+# Word lists for generated data
+ADJECTIVES = ['Blue', 'Bright', 'Cloud', 'Data', 'Deep', 'Green', 'Hyper', 'Iron', 'Lunar', 'Nimbus',
+              'Open', 'Pixel', 'Quantum', 'Rapid', 'Silver', 'Smart', 'Solar', 'Swift', 'Terra', 'Vector']
+NOUNS = ['Analytics', 'Labs', 'Systems', 'Networks', 'Works', 'Dynamics', 'Software', 'Health',
+         'Logistics', 'Media', 'Robotics', 'Security', 'Finance', 'Studios', 'Energy']
+LOCATIONS = ['San Francisco, CA', 'New York, NY', 'Seattle, WA', 'Boston, MA', 'Austin, TX', 'Chicago, IL',
+             'Denver, CO', 'Atlanta, GA', 'Los Angeles, CA', 'Portland, OR', 'Remote']
+SENIORITY = {'Entry': 'Junior', 'Mid': '', 'Senior': 'Senior', 'Executive': 'Head of'}
+TECHNOLOGIES = ['Python', 'Django', 'React', 'TypeScript', 'Go', 'Rust', 'Java', 'Kotlin', 'PostgreSQL',
+                'Kubernetes', 'AWS', 'Terraform', 'Spark', 'PyTorch', 'GraphQL', 'Swift', 'Node.js', 'Scala']
+ROLES = ['Backend Developer', 'Frontend Developer', 'Full Stack Engineer', 'Data Engineer', 'DevOps Engineer',
+         'Machine Learning Engineer', 'Mobile Developer', 'Site Reliability Engineer', 'Security Engineer',
+         'QA Engineer', 'Data Scientist', 'Platform Engineer', 'Product Manager', 'Technical Writer']
+SENTENCES = [
+    'You will design, build and maintain services used by millions of people.',
+    'Work closely with product, design and data teams to ship features every week.',
+    'We value code review, automated testing and clear documentation.',
+    'Help us scale our platform and keep it fast and reliable.',
+    'Mentor other engineers and take ownership of critical systems.',
+    'Our stack runs in the cloud and we deploy many times a day.',
+    'Flexible hours, a learning budget and a friendly, distributed team.',
+]
+STATUSES = [status for status, _ in Application.STATUS_CHOICES]
+JOB_TYPES = [job_type for job_type, _ in Job.JOB_TYPE_CHOICES]
+EXPERIENCE_LEVELS = [level for level, _ in Job.EXPERIENCE_LEVEL_CHOICES]
+
+# Signals muted while loading; what their receivers maintain (search index,
+# company stats, caches, user profiles) is built in bulk instead
+SIGNALS = (signals.pre_init, signals.post_init, signals.pre_save, signals.post_save)
+
+
+@contextmanager
+def bulk_loading():
+    """
+    Mute model signals and let generated rows keep their own auto_now(_add)
+    dates for the duration of the block.
+    """
+    saved = [(signal, signal.receivers) for signal in SIGNALS]
+    auto_fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in (Company, Job, Application, Bookmark, UserProfile)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    try:
+        for signal, _ in saved:
+            signal.receivers = []
+            signal.sender_receivers_cache.clear()
+        for field, _, _ in auto_fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+        for field, auto_now, auto_now_add in auto_fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
 
 
 class Command(BaseCommand):
-    help = 'Populate the database with sample jobs and companies'
+    help = ('Populate the database with sample jobs and companies, or with generated data '
+            'for load testing (--companies/--jobs/--users/--applications/--bookmarks)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=0, help='Companies to generate')
+        parser.add_argument('--jobs', type=int, default=0, help='Jobs to generate')
+        parser.add_argument('--users', type=int, default=0, help='Users to generate (with profiles)')
+        parser.add_argument('--applications', type=int, default=0, help='Applications to generate')
+        parser.add_argument('--bookmarks', type=int, default=0, help='Bookmarks to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed generates the same data')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
 
     def handle(self, *args, **options):
+        counts = {name: options[name] for name in ('companies', 'jobs', 'users', 'applications', 'bookmarks')}
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Counts must not be negative.')
+        if any(counts.values()):
+            self.generate(counts, options['seed'], options['batch_size'])
+        else:
+            self.populate_samples()
+
+    def populate_samples(self):
         # Create sample companies
         companies_data = [
             {
@@ -195,3 +285,190 @@ class Command(BaseCommand):
                 self.stdout.write(f'Job already exists: {job.title}')
 
         self.stdout.write(self.style.SUCCESS('\n✅ Successfully populated the database with sample jobs!'))
+
+
+    # ==================== Generated data ====================
+
+    def generate(self, counts, seed, batch_size):
+        """Bulk-load generated rows, then rebuild what the muted signals maintain"""
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.now = timezone.now()
+        started = time.monotonic()
+
+        with bulk_loading():
+            company_ids = self.generate_companies(counts['companies']) or list(
+                Company.objects.values_list('pk', flat=True)
+            )
+            user_ids, employers = self.generate_users(counts['users'], company_ids)
+            if not user_ids:
+                user_ids = list(User.objects.values_list('pk', flat=True))
+            if counts['jobs'] and not company_ids:
+                raise CommandError('Jobs need companies; pass --companies or load the samples first.')
+            job_ids = self.generate_jobs(counts['jobs'], company_ids, employers) or list(
+                Job.objects.filter(is_active=True).values_list('pk', flat=True)
+            )
+            if (counts['applications'] or counts['bookmarks']) and not (user_ids and job_ids):
+                raise CommandError('Applications and bookmarks need users and jobs.')
+            self.generate_pairs(Application, counts['applications'], user_ids, job_ids)
+            self.generate_pairs(Bookmark, counts['bookmarks'], user_ids, job_ids)
+
+        self.stdout.write('Rebuilding search index and company stats...')
+        search.rebuild_index()
+        stats.rebuild_company_stats()
+        facets.invalidate()
+        leaderboards.invalidate()
+        page_cache.purge('index', *(f'company:{pk}' for pk in company_ids))
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Generated data in {time.monotonic() - started:.1f}s'))
+
+    def insert(self, model, rows, total):
+        """bulk_create rows (an iterable) batch by batch; returns the new pks"""
+        pks = []
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch, batch_size=self.batch_size)
+            pks.extend(obj.pk for obj in created)
+            self.stdout.write(f'\r{model._meta.verbose_name_plural}: {len(pks):,}/{total:,}', ending='')
+            self.stdout.flush()
+        if total:
+            self.stdout.write('')
+        return pks
+
+    def past(self, days):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def next_number(self, model):
+        """Suffix for unique names that can't clash with earlier runs"""
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def generate_companies(self, count):
+        start = self.next_number(Company)
+        rng = self.rng
+
+        def rows():
+            for number in range(start, start + count):
+                name = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {number}'
+                domain = name.lower().replace(' ', '')
+                yield Company(
+                    name=name,
+                    description=f'{name} builds products for {rng.choice(NOUNS).lower()} teams.',
+                    website=f'https://{domain}.example.com',
+                    email=f'jobs@{domain}.example.com',
+                    location=rng.choice(LOCATIONS),
+                    created_date=self.past(3 * 365),
+                )
+        return self.insert(Company, rows(), count)
+
+    def generate_users(self, count, company_ids):
+        """Create users and their profiles; about one in twenty is an employer"""
+        start = self.next_number(User)
+        password = make_password('password')  # Hashing once; every generated user can log in with it
+        user_ids = self.insert(User, (
+            User(
+                username=f'user{number}',
+                email=f'user{number}@example.com',
+                password=password,
+                date_joined=self.past(2 * 365),
+            )
+            for number in range(start, start + count)
+        ), count)
+
+        employers = {}
+        rng = self.rng
+
+        def profiles():
+            for user_id in user_ids:
+                company_id = rng.choice(company_ids) if company_ids and rng.random() < 0.05 else None
+                if company_id:
+                    employers.setdefault(company_id, []).append(user_id)
+                yield UserProfile(user_id=user_id, is_employer=bool(company_id), company_id=company_id,
+                                  created_date=self.now)
+        self.insert(UserProfile, profiles(), len(user_ids))
+        return user_ids, employers
+
+    def generate_jobs(self, count, company_ids, employers):
+        rng = self.rng
+        views = []
+
+        def rows():
+            for _ in range(count):
+                company_id = rng.choice(company_ids)
+                level = rng.choice(EXPERIENCE_LEVELS)
+                tech = rng.choice(TECHNOLOGIES)
+                salary_min = rng.randrange(50, 200) * 1000
+                posted_date = self.past(365)
+                job = Job(
+                    title=f'{SENIORITY[level]} {tech} {rng.choice(ROLES)}'.strip(),
+                    company_id=company_id,
+                    posted_by_id=rng.choice(employers[company_id]) if company_id in employers else None,
+                    location=rng.choice(LOCATIONS),
+                    description=' '.join(rng.sample(SENTENCES, 3)),
+                    requirements='\n'.join(rng.sample(TECHNOLOGIES, 4)),
+                    salary_min=salary_min,
+                    salary_max=salary_min + rng.randrange(10, 60) * 1000,
+                    job_type=rng.choice(JOB_TYPES),
+                    experience_level=level,
+                    posted_date=posted_date,
+                    deadline=(posted_date + timedelta(days=rng.randrange(14, 90))).date(),
+                    # Most jobs are open; views follow a long tail
+                    is_active=rng.random() < 0.9,
+                    views_count=int(rng.paretovariate(1.2) * 10),
+                )
+                views.append(job.views_count)
+                yield job
+        job_ids = self.insert(Job, rows(), count)
+        self.generate_daily_views(zip(job_ids, views))
+        return job_ids
+
+    def generate_daily_views(self, job_views):
+        """Part of some jobs' views spread over the last week, for the trending leaderboard"""
+        # Own generator, so the rows generated after these stay the same for a seed
+        rng = random.Random(f'{self.seed}-daily-views')
+        today = self.now.date()
+        plan = []
+        for job_id, total in job_views:
+            if total and rng.random() < 0.3:
+                for age in range(7):
+                    day_views = int(total * rng.random() / 20)
+                    if day_views:
+                        plan.append((job_id, today - timedelta(days=age), day_views))
+        self.insert(JobDailyViews, (JobDailyViews(job_id=job_id, day=day, views=day_views)
+                                    for job_id, day, day_views in plan), len(plan))
+
+    def generate_pairs(self, model, count, user_ids, job_ids):
+        """
+        Applications or bookmarks with unique (user, job) pairs: user i gets
+        consecutive jobs from a random starting point, so no pair repeats
+        without having to remember the pairs already generated.
+        """
+        if not count:
+            return
+        count = min(count, len(user_ids) * len(job_ids))
+        rng = self.rng
+        date_field = 'applied_date' if model is Application else 'created_date'
+
+        def rows():
+            per_user, extra = divmod(count, len(user_ids))
+            for index, user_id in enumerate(user_ids):
+                start = rng.randrange(len(job_ids))
+                for offset in range(per_user + (index < extra)):
+                    fields = {'user_id': user_id, 'job_id': job_ids[(start + offset) % len(job_ids)],
+                              date_field: self.past(180)}
+                    if model is Application:
+                        fields.update(resume='resumes/generated.pdf', status=rng.choice(STATUSES),
+                                      updated_date=fields['applied_date'])
+                    yield model(**fields)
+
+        rows = iter(rows())
+        inserted = 0
+        while batch := list(islice(rows, self.batch_size)):
+            # Existing users may already have applied to / bookmarked a job
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size, ignore_conflicts=True)
+            inserted += len(batch)
+            self.stdout.write(f'\r{model._meta.verbose_name_plural}: {inserted:,}/{count:,}', ending='')
+            self.stdout.flush()
+        self.stdout.write('')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from jobs import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized company stats from the job and application tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert')
+
+    def handle(self, *args, **options):
+        rows = stats.rebuild_company_stats(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rows} companies.'))
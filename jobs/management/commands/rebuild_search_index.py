@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the Job table'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index for the {connection.vendor} backend, nothing to do.'
+            ))
+            return
+
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
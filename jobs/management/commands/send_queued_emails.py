@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox (runs as a worker process)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per SMTP connection')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = outbox.send_batch(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue  # More may be due
+            if options['once']:
+                break
+            time.sleep(options['interval'])
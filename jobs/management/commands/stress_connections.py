@@ -0,0 +1,181 @@
+import threading
+import time
+import weakref
+from copy import deepcopy
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+
+
+class ConnectionMonitor:
+    """
+    Samples how many database connections are open while the load runs.
+
+    On PostgreSQL this is the server's own count (pg_stat_activity), read over
+    a separate unpooled connection and relative to the count before the run.
+    Other databases have no server to ask; there it counts the connections
+    Django opened that are still open.
+    """
+
+    def __init__(self, alias, interval):
+        self.alias = alias
+        self.interval = interval
+        self.samples = []
+        self.opened = 0
+        self._open = weakref.WeakSet()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._server = None
+        self._baseline = 0
+        if connections[alias].vendor == 'postgresql':
+            settings_dict = deepcopy(connections[alias].settings_dict)
+            settings_dict['OPTIONS'].pop('pool', None)
+            self._server = connections[alias].__class__(settings_dict, alias=f'{alias}_monitor')
+
+    def _connection_created(self, sender, connection, **kwargs):
+        if connection.alias == self.alias:
+            self.opened += 1
+            self._open.add(connection)
+
+    def count(self):
+        if self._server is not None:
+            with self._server.cursor() as cursor:
+                cursor.execute(
+                    'SELECT count(*) FROM pg_stat_activity '
+                    'WHERE datname = current_database() AND pid <> pg_backend_pid()'
+                )
+                return cursor.fetchone()[0] - self._baseline
+        return sum(1 for connection in list(self._open) if connection.connection is not None)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples.append(self.count())
+
+    def __enter__(self):
+        self._baseline = self.count() if self._server is not None else 0
+        connection_created.connect(self._connection_created)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append(self.count())
+        connection_created.disconnect(self._connection_created)
+        if self._server is not None:
+            self._server.close()
+
+
+class Command(BaseCommand):
+    help = ('Request the jobs views from many threads at once and check that the number of '
+            'open database connections stays within the pool size (or one per thread)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent request threads')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per thread')
+        parser.add_argument('--interval', type=float, default=0.05, help='Seconds between connection samples')
+        parser.add_argument('--max-connections', type=int,
+                            help='Fail above this many connections (default: the pool size, else one per thread)')
+        parser.add_argument('--username', help='User to request as (default: the first user)')
+
+    def session_cookie(self, username):
+        """A logged-in session, so requests render instead of hitting the page cache"""
+        user = User.objects.filter(username=username).first() if username else User.objects.first()
+        if user is None:
+            raise CommandError('No users; run populate_jobs with --users first.')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session
+
+    def paths(self):
+        jobs = list(Job.objects.filter(is_active=True).order_by('-posted_date', '-id')[:20])
+        if not jobs:
+            raise CommandError('No active jobs; run populate_jobs first.')
+        paths = [reverse('jobs:index'), reverse('jobs:dashboard')]
+        for job in jobs:
+            paths.append(reverse('jobs:job_detail', args=[job.pk]))
+            paths.append(reverse('jobs:company_detail', args=[job.company_id]))
+        return paths
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        pool_options = connection.settings_dict['OPTIONS'].get('pool')
+        if pool_options:
+            mode = 'pool'
+            bound = (pool_options if isinstance(pool_options, dict) else {}).get('max_size') or 4
+        else:
+            mode = f'CONN_MAX_AGE={connection.settings_dict["CONN_MAX_AGE"]}'
+            bound = options['threads']
+        bound = options['max_connections'] or bound
+        health_checks = connection.settings_dict['CONN_HEALTH_CHECKS']
+
+        session = self.session_cookie(options['username'])
+        paths = self.paths()
+        # Start from nothing: the counts below are the load's alone
+        connections.close_all()
+        if pool_options:
+            connection.close_pool()
+
+        statuses = {}
+        lock = threading.Lock()
+
+        def worker(offset):
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            try:
+                for index in range(options['requests']):
+                    try:
+                        status = client.get(paths[(offset + index) % len(paths)]).status_code
+                    except Exception as error:  # e.g. PoolTimeout when no connection frees up in time
+                        status = type(error).__name__
+                    # A server does this when each request finishes (returning a
+                    # pooled connection, closing an expired one); the test client doesn't
+                    close_old_connections()
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+            finally:
+                # As when a server thread exits
+                connections.close_all()
+
+        self.stdout.write(
+            f'{connection.vendor}, {mode}, CONN_HEALTH_CHECKS={health_checks}: '
+            f'{options["threads"]} threads x {options["requests"]} requests'
+        )
+        start = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['*']), ConnectionMonitor('default', options['interval']) as monitor:
+            threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(options['threads'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        if pool_options:
+            # Borrowing from the pool fires connection_created each time; count real connects
+            opened = connection.pool.get_stats().get('connections_num', 0) if connection.pool else 0
+        else:
+            opened = monitor.opened
+        session.delete()
+
+        total = sum(statuses.values())
+        peak = max(monitor.samples)
+        self.stdout.write(f'Requests:    {total} in {elapsed:.1f}s ({total / elapsed:.0f}/s), statuses {statuses}')
+        self.stdout.write(f'Connections: peak {peak} open, {monitor.samples[-1]} at the end, {opened} opened')
+        if peak > bound:
+            raise CommandError(f'{peak} connections open at once, more than the bound of {bound}.')
+        if any(status != 200 for status in statuses):
+            raise CommandError('Some requests failed; see the statuses above.')
+        self.stdout.write(self.style.SUCCESS(f'Connections stayed within the bound of {bound}.'))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs import caching, facets, leaderboards, stats
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = ('Fill the caches after a deploy: filter facets, the trending and newest job leaderboards, '
+            'related jobs of the most viewed jobs and the anonymous homepage')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=50,
+                            help='Most viewed jobs whose company job lists to cache')
+
+    def step(self, label, func):
+        start = time.perf_counter()
+        result = func()
+        self.stdout.write(f'{label:<40} {(time.perf_counter() - start) * 1000:8.1f}ms')
+        return result
+
+    def handle(self, *args, **options):
+        # Recompute rather than keep whatever an older release cached
+        facets.invalidate()
+
+        self.step('Filter facets', facets.get_counts)
+        seeded = self.step('Seed daily views', leaderboards.seed_daily_views)
+        if seeded:
+            self.stdout.write(f'  popular board seeded from the views of {seeded} jobs')
+        self.step('Leaderboards', leaderboards.rebuild)
+
+        popular = list(Job.objects.filter(is_active=True).order_by('-views_count')[:options['jobs']])
+        self.step(f'Related jobs of {len(popular)} most viewed jobs', lambda: [stats.related_jobs(job) for job in popular])
+
+        # Renders the page once, filling the page cache, the job count and template fragments
+        with override_settings(ALLOWED_HOSTS=['*']):
+            response = self.step('Homepage', lambda: Client().get(reverse('jobs:index')))
+        if response.status_code != 200:
+            self.stderr.write(self.style.WARNING(f'Homepage returned {response.status_code}'))
+
+        lookups = caching.stats()
+        for namespace in sorted({namespace for namespace, _ in lookups}):
+            results = ', '.join(
+                f'{result} {count}' for (name, result), count in sorted(lookups.items()) if name == namespace
+            )
+            self.stdout.write(f'  {namespace}: {results}')
+        self.stdout.write(self.style.SUCCESS('Caches warmed.'))
@@ -0,0 +1,339 @@
+"""
+Per-request performance metrics.
+
+``RequestMetricsMiddleware`` (jobs.middleware) opens a ``RequestMetrics``
+for every request. While it is current, the hooks below add to it:
+
+* SQL queries and their time, from an ``execute_wrapper`` installed once on
+  every database connection;
+* template render time, from the ``InstrumentedDjangoTemplates`` backend;
+* cache hits and misses, from wrappers around ``get``/``get_many`` of the
+  configured caches (this includes ``{% cache %}`` fragments).
+
+Per-namespace lookups of the two-tier cache (jobs.caching) are exported too.
+
+Finished requests are added to histograms per URL name. Each process
+publishes its histograms to the cache every ``REQUEST_METRICS_PUBLISH_INTERVAL``
+seconds (from a thread for async requests, as the cache may be the database), and ``render_prometheus`` sums what all processes published, so the
+``/metrics/`` endpoint shows the whole deployment whichever worker serves it.
+"""
+import contextvars
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import caching
+
+
+_current = contextvars.ContextVar('jobs_request_metrics', default=None)
+
+_MISSING = object()
+
+# Histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    __slots__ = ('start', 'sql_count', 'sql_time', 'template_time', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    """Make a new RequestMetrics current; returns it and the reset token"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+# ==================== SQL ====================
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_time += time.perf_counter() - start
+
+
+def instrument_connection(sender, connection, **kwargs):
+    # Fired on every (re)connect of the same wrapper; install once. First in
+    # the list: execute_wrapper() blocks pop the last one on exit, and a
+    # connection may open inside one
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(instrument_connection, dispatch_uid='jobs.metrics.instrument_connection')
+
+
+def instrument_connections():
+    """Cover connections of this thread opened before this module was imported"""
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(None, connection)
+
+
+# ==================== Templates ====================
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# ==================== Cache ====================
+
+def _count_get(get):
+    @wraps(get)
+    def wrapper(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        metrics = _current.get()
+        if metrics is not None:
+            if value is _MISSING:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISSING else value
+    return wrapper
+
+
+def _count_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def instrument_caches():
+    """
+    Count hits and misses on the cache instances of this thread. Backends
+    are created per thread, so this runs per request and is a no-op for
+    instances already wrapped.
+    """
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        if not getattr(backend, '_jobs_metrics', False):
+            backend.get = _count_get(backend.get)
+            backend.get_many = _count_get_many(backend.get_many)
+            backend._jobs_metrics = True
+
+
+# ==================== Aggregation ====================
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets, counts=None, total=0.0, count=0):
+        self.buckets = buckets
+        self.counts = counts or [0] * len(buckets)
+        self.sum = total
+        self.count = count
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other['counts'])]
+        self.sum += other['sum']
+        self.count += other['count']
+
+    def as_dict(self):
+        return {'counts': self.counts, 'sum': self.sum, 'count': self.count}
+
+
+# (name, buckets, help, value from a finished request)
+HISTOGRAMS = (
+    ('jobs_request_duration_seconds', DURATION_BUCKETS, 'Request duration', lambda m, total: total),
+    ('jobs_request_db_seconds', DURATION_BUCKETS, 'Time spent in SQL per request', lambda m, total: m.sql_time),
+    ('jobs_request_db_queries', QUERY_BUCKETS, 'SQL queries per request', lambda m, total: m.sql_count),
+    ('jobs_request_template_seconds', DURATION_BUCKETS, 'Template render time per request',
+     lambda m, total: m.template_time),
+)
+
+# (name, help, value from a finished request)
+COUNTERS = (
+    ('jobs_cache_hits_total', 'Cache hits', lambda m: m.cache_hits),
+    ('jobs_cache_misses_total', 'Cache misses', lambda m: m.cache_misses),
+)
+
+_INDEX_KEY = 'jobs:metrics:processes'
+
+
+def _process_key(process_id):
+    return f'jobs:metrics:process:{process_id}'
+
+
+class Registry:
+    """This process's histograms and counters, published to the cache periodically"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.process_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, view) -> Histogram
+        self.counters = {}  # (name, labels) -> value
+        self._last_publish = 0.0
+
+    def observe(self, view, status, metrics, total):
+        """Add a finished request; returns True when the caller should publish()"""
+        with self.lock:
+            for name, buckets, _, value in HISTOGRAMS:
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[(name, view)] = Histogram(buckets)
+                histogram.observe(value(metrics, total))
+            requests_key = ('jobs_requests_total', (view, str(status)))
+            self.counters[requests_key] = self.counters.get(requests_key, 0) + 1
+            for name, _, value in COUNTERS:
+                key = (name, (view,))
+                self.counters[key] = self.counters.get(key, 0) + value(metrics)
+            due = time.monotonic() - self._last_publish >= self.interval
+            if due:
+                # Claimed here, so concurrent requests don't all publish
+                self._last_publish = time.monotonic()
+        return due
+
+    def snapshot(self):
+        with self.lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, view, h.as_dict()] for (name, view), h in self.histograms.items()]
+        counters += [
+            ['jobs_tiered_cache_lookups_total', [namespace, result], value]
+            for (namespace, result), value in caching.stats().items()
+        ]
+        return {'histograms': histograms, 'counters': counters}
+
+    def publish(self):
+        """Store this process's totals in the cache for the metrics endpoint"""
+        self._last_publish = time.monotonic()
+        # Entries of dead processes expire; Prometheus treats the drop as a counter reset
+        ttl = max(self.interval * 10, 300)
+        cache.set(_process_key(self.process_id), self.snapshot(), ttl)
+        processes = cache.get(_INDEX_KEY) or []
+        if self.process_id not in processes:
+            # A concurrent registration may be lost; it is redone on the next publish
+            cache.set(_INDEX_KEY, [p for p in processes if p != self.process_id] + [self.process_id], None)
+
+
+_registry = None
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        _registry = Registry(getattr(settings, 'REQUEST_METRICS_PUBLISH_INTERVAL', 15))
+    return _registry
+
+
+def aggregate():
+    """Sum the published totals of every live process"""
+    get_registry().publish()
+    processes = cache.get(_INDEX_KEY) or []
+    snapshots = cache.get_many([_process_key(p) for p in processes])
+    live = [p for p in processes if _process_key(p) in snapshots]
+    if len(live) != len(processes):
+        cache.set(_INDEX_KEY, live, None)
+
+    buckets = {name: bounds for name, bounds, _, _ in HISTOGRAMS}
+    histograms, counters = {}, {}
+    for snapshot in snapshots.values():
+        for name, view, data in snapshot['histograms']:
+            histogram = histograms.get((name, view))
+            if histogram is None:
+                histogram = histograms[(name, view)] = Histogram(buckets[name])
+            histogram.merge(data)
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """The aggregated metrics in the Prometheus text exposition format"""
+    histograms, counters = aggregate()
+    lines = []
+    for name, buckets, description, _ in HISTOGRAMS:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for (metric, view), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            label = f'view="{_escape(view)}"'
+            cumulative = 0
+            for bound, count in zip(buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+    label_names = {
+        'jobs_requests_total': ('view', 'status'),
+        'jobs_tiered_cache_lookups_total': ('namespace', 'result'),
+    }
+    totals = [('jobs_requests_total', 'Requests')] + [(n, d) for n, d, _ in COUNTERS] + [
+        ('jobs_tiered_cache_lookups_total', 'jobs.caching lookups by result (local_hit, shared_hit, stale, waited, miss)'),
+    ]
+    for name, description in totals:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        names = label_names.get(name, ('view',))
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                label = ','.join(f'{key}="{_escape(val)}"' for key, val in zip(names, labels))
+                lines.append(f'{name}{{{label}}} {value}')
+    return '\n'.join(lines) + '\n'
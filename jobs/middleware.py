@@ -0,0 +1,133 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics, replicas
+
+
+logger = logging.getLogger('jobs.metrics')
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure each request (SQL, templates, cache, total time), report it in a
+    Server-Timing header and a log line, and add it to the /metrics/ histograms.
+
+    Place it first in MIDDLEWARE so the total covers the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics.instrument_connections()
+        metrics.instrument_caches()
+        request_metrics, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        if self.finish(request, response, request_metrics):
+            metrics.get_registry().publish()
+        return response
+
+    async def __acall__(self, request):
+        # ORM queries run in sync_to_async threads; the context variable
+        # follows them there and connection_created instruments their connections
+        metrics.instrument_caches()
+        request_metrics, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        if self.finish(request, response, request_metrics):
+            # Blocking cache I/O (a query with the db cache): not on the event loop
+            await sync_to_async(metrics.get_registry().publish)()
+        return response
+
+    def finish(self, request, response, request_metrics):
+        """Report the request; returns True when this process's metrics are due to be published"""
+        total = time.perf_counter() - request_metrics.start
+
+        match = request.resolver_match
+        # Unmatched URLs share one label to keep the number of series bounded
+        view = match.view_name if match else 'unresolved'
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={request_metrics.sql_time * 1000:.1f};desc="{request_metrics.sql_count} queries"',
+                f'tpl;dur={request_metrics.template_time * 1000:.1f}',
+                f'cache;desc="{request_metrics.cache_hits} hits, {request_metrics.cache_misses} misses"',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        # At DEBUG: a line per request would flood the logs (and test output)
+        logger.debug(
+            'view=%s method=%s status=%s duration_ms=%.1f db_queries=%d db_ms=%.1f template_ms=%.1f '
+            'cache_hits=%d cache_misses=%d',
+            view, request.method, response.status_code, total * 1000,
+            request_metrics.sql_count, request_metrics.sql_time * 1000, request_metrics.template_time * 1000,
+            request_metrics.cache_hits, request_metrics.cache_misses,
+            extra={
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 1),
+                'db_queries': request_metrics.sql_count,
+                'db_ms': round(request_metrics.sql_time * 1000, 1),
+                'template_ms': round(request_metrics.template_time * 1000, 1),
+                'cache_hits': request_metrics.cache_hits,
+                'cache_misses': request_metrics.cache_misses,
+            },
+        )
+        return metrics.get_registry().observe(view, response.status_code, request_metrics, total)
+
+
+class ReplicaMiddleware:
+    """
+    Read-your-writes for replica routing (jobs.replicas): a request that wrote
+    pins its browser to the primary database for REPLICA_STICKY_SECONDS.
+
+    Place it before SessionMiddleware so session writes count too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = replicas.start_request(pinned=replicas.STICKY_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state, token = replicas.start_request(pinned=replicas.STICKY_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self.finish(response, state)
+
+    def finish(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                replicas.STICKY_COOKIE, '1', max_age=self.sticky_seconds,
+                httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS jobs_job_fts USING fts5("
+            "title, company, location, description, requirements, "
+            "tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO jobs_job_fts (rowid, title, company, location, description, requirements) "
+            "SELECT j.id, j.title, c.name, j.location, j.description, COALESCE(j.requirements, '') "
+            "FROM jobs_job j JOIN jobs_company c ON c.id = j.company_id WHERE j.is_active"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS jobs_job_search ("
+            "job_id bigint PRIMARY KEY REFERENCES jobs_job (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_job_search_document_gin "
+            "ON jobs_job_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO jobs_job_search (job_id, document) "
+            "SELECT j.id, "
+            "setweight(to_tsvector('english', j.title), 'A') || "
+            "setweight(to_tsvector('english', c.name), 'B') || "
+            "setweight(to_tsvector('english', j.location), 'B') || "
+            "setweight(to_tsvector('english', j.description), 'C') || "
+            "setweight(to_tsvector('english', COALESCE(j.requirements, '')), 'D') "
+            "FROM jobs_job j JOIN jobs_company c ON c.id = j.company_id WHERE j.is_active"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS jobs_job_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS jobs_job_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_job_posted_by_userprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
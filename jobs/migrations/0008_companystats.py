@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 20:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_company_stats(apps, schema_editor):
+    Company = apps.get_model('jobs', 'Company')
+    CompanyStats = apps.get_model('jobs', 'CompanyStats')
+    Application = apps.get_model('jobs', 'Application')
+
+    applications = dict(
+        Application.objects.order_by().values_list('job__company').annotate(count=Count('id'))
+    )
+    companies = Company.objects.annotate(
+        active_jobs=Count('jobs', filter=Q(jobs__is_active=True)),
+        total_views=Sum('jobs__views_count'),
+    )
+    CompanyStats.objects.bulk_create([
+        CompanyStats(
+            company_id=company.pk,
+            active_jobs=company.active_jobs,
+            total_applications=applications.get(company.pk, 0),
+            total_views=company.total_views or 0,
+        )
+        for company in companies.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyStats',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='jobs.company')),
+                ('active_jobs', models.IntegerField(default=0)),
+                ('total_applications', models.IntegerField(default=0)),
+                ('total_views', models.BigIntegerField(default=0)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Company stats',
+            },
+        ),
+        migrations.RunPython(backfill_company_stats, migrations.RunPython.noop),
+    ]
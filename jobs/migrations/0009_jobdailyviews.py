@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_companystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.IntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='jobs.job')),
+            ],
+            options={
+                'verbose_name_plural': 'Job daily views',
+                'indexes': [models.Index(fields=['day'], name='job_daily_views_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'day'), name='job_daily_views_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def index_inactive_jobs(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "INSERT INTO jobs_job_fts (rowid, title, company, location, description, requirements) "
+            "SELECT j.id, j.title, c.name, j.location, j.description, COALESCE(j.requirements, '') "
+            "FROM jobs_job j JOIN jobs_company c ON c.id = j.company_id "
+            "WHERE NOT j.is_active AND j.id NOT IN (SELECT rowid FROM jobs_job_fts)"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "INSERT INTO jobs_job_search (job_id, document) "
+            "SELECT j.id, "
+            "setweight(to_tsvector('english', j.title), 'A') || "
+            "setweight(to_tsvector('english', c.name), 'B') || "
+            "setweight(to_tsvector('english', j.location), 'B') || "
+            "setweight(to_tsvector('english', j.description), 'C') || "
+            "setweight(to_tsvector('english', COALESCE(j.requirements, '')), 'D') "
+            "FROM jobs_job j JOIN jobs_company c ON c.id = j.company_id "
+            "WHERE NOT j.is_active "
+            "ON CONFLICT (job_id) DO NOTHING"
+        )
+
+
+def unindex_inactive_jobs(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "DELETE FROM jobs_job_fts WHERE rowid IN (SELECT id FROM jobs_job WHERE NOT is_active)"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "DELETE FROM jobs_job_search WHERE job_id IN (SELECT id FROM jobs_job WHERE NOT is_active)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_jobdailyviews'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_inactive_jobs, unindex_inactive_jobs),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.validators import URLValidator
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -86,13 +88,26 @@ class Job(models.Model):
     class Meta:
         ordering = ['-posted_date']
         verbose_name_plural = "Jobs"
+        indexes = [
+            # Homepage listing: active jobs, newest first (keyset on posted_date, id).
+            # Partial rather than led by is_active: "WHERE is_active" is not an
+            # equality SQLite can match against a composite index
+            models.Index(fields=['-posted_date', '-id'], condition=Q(is_active=True), name='job_active_posted_idx'),
+            # Company page listing and stats
+            models.Index(fields=['company', '-posted_date', '-id'], condition=Q(is_active=True),
+                         name='job_company_active_idx'),
+            # Dashboard "most viewed"
+            models.Index(fields=['-views_count'], condition=Q(is_active=True), name='job_active_views_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} at {self.company}"
     
     def increment_views(self):
+        """Count a view; written back to the database in batches by jobs.counters"""
+        from .counters import record_view
+        record_view(self.pk)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
 
 
 class Application(models.Model):
@@ -117,11 +132,36 @@ class Application(models.Model):
     class Meta:
         ordering = ['-applied_date']
         unique_together = ('job', 'user')
+        indexes = [
+            # My applications, newest first
+            models.Index(fields=['user', '-applied_date', '-id'], name='app_user_applied_idx'),
+            # A job's applicants, newest first
+            models.Index(fields=['job', '-applied_date', '-id'], name='app_job_applied_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} applied for {self.job.title}"
 
 
+class ApplicationStatusChange(models.Model):
+    """Audit trail of application status changes"""
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='status_changes')
+    old_status = models.CharField(max_length=50, choices=Application.STATUS_CHOICES)
+    new_status = models.CharField(max_length=50, choices=Application.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changed_date = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-changed_date']
+        indexes = [
+            # An application's history, newest first
+            models.Index(fields=['application', '-changed_date'], name='status_change_app_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Application {self.application_id}: {self.old_status} -> {self.new_status}"
+
+
 class Bookmark(models.Model):
     """Bookmark/Wishlist model for saving jobs"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookmarks')
@@ -131,6 +171,78 @@ class Bookmark(models.Model):
     class Meta:
         ordering = ['-created_date']
         unique_together = ('user', 'job')
+        indexes = [
+            # My bookmarks, newest first
+            models.Index(fields=['user', '-created_date', '-id'], name='bookmark_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} bookmarked {self.job.title}"
+
+
+class CompanyStats(models.Model):
+    """Denormalized per-company counters, kept up to date by signals (see jobs.stats)"""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    active_jobs = models.IntegerField(default=0)
+    total_applications = models.IntegerField(default=0)
+    total_views = models.BigIntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Company stats"
+    
+    def __str__(self):
+        return f"Stats for {self.company}"
+
+
+class JobDailyViews(models.Model):
+    """Views of a job per day, for the decayed "trending" leaderboard (see jobs.leaderboards)"""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='daily_views')
+    day = models.DateField()
+    views = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Job daily views"
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'day'], name='job_daily_views_unique'),
+        ]
+        indexes = [
+            # Leaderboard rebuild: the last few days, all jobs
+            models.Index(fields=['day'], name='job_daily_views_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.job_id} on {self.day}: {self.views}"
+
+
+class OutboundEmail(models.Model):
+    """Email waiting to be sent by the send_queued_emails worker"""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text='Comma-separated email addresses')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['created_date']
+        indexes = [
+            # Worker: pending emails that are due
+            models.Index(fields=['next_attempt_date'], condition=Q(status='Pending'), name='email_pending_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients} ({self.status})"
+    
+    def recipient_list(self):
+        return [address.strip() for address in self.recipients.split(',') if address.strip()]
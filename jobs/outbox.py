@@ -0,0 +1,122 @@
+"""
+Email outbox.
+
+Views don't talk to the SMTP server any more: ``enqueue`` stores the email in
+the ``OutboundEmail`` table (inside the caller's transaction) and the
+``send_queued_emails`` worker delivers it. The worker sends each batch over a
+single SMTP connection and retries failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    """Queue an email; returns the OutboundEmail row"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=','.join(recipients),
+    )
+
+
+def enqueue_many(emails, from_email=None):
+    """Queue (subject, body, recipients) emails with one INSERT per 500"""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    return OutboundEmail.objects.bulk_create(
+        [
+            OutboundEmail(subject=subject, body=body, from_email=from_email, recipients=','.join(recipients))
+            for subject, body, recipients in emails
+        ],
+        batch_size=500,
+    )
+
+
+def backoff(attempts):
+    """Delay before retry number attempts (1-based): 1, 2, 4, 8... minutes, capped"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 3600))
+
+
+def _claim(batch_size):
+    """
+    Lease a batch of due emails. Pushing next_attempt_date forward keeps other
+    workers off them without holding a transaction open during SMTP; if this
+    worker dies they become due again when the lease runs out.
+    """
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 600))
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_date__lte=timezone.now())
+            .order_by('next_attempt_date')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            next_attempt_date=timezone.now() + lease
+        )
+    return emails
+
+
+def send_batch(batch_size=100):
+    """
+    Send one batch of due emails over a single connection.
+
+    Returns (sent, failed) counts.
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    emails = _claim(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Server unreachable: retry the whole batch later
+        logger.warning('Could not connect to the mail server: %s', e)
+        for email in emails:
+            _record_failure(email, e, max_attempts)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipient_list(),
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning('Failed to send email %s: %s', email.pk, e)
+                _record_failure(email, e, max_attempts)
+                failed += 1
+            else:
+                email.status = 'Sent'
+                email.attempts += 1
+                email.sent_date = timezone.now()
+                email.save(update_fields=['status', 'attempts', 'sent_date'])
+                sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
+
+
+def _record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'Failed'
+    email.next_attempt_date = timezone.now() + backoff(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_date'])
@@ -0,0 +1,171 @@
+"""
+Full-page cache for anonymous visitors.
+
+Logged-out visitors all see the same HTML for a given URL, so ``index``,
+``job_detail`` and ``company_detail`` responses are cached whole, keyed on the
+view, its URL arguments and the normalized query string (known parameters
+only, empty values dropped, sorted).
+
+Each entry records the dependency tokens it was rendered from. Committing a Job or
+Company change replaces the tokens it affects (see ``purge_job``/``purge_company``),
+which invalidates exactly the pages that showed it. Served pages carry an
+ETag and Last-Modified so browsers can revalidate with a 304.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+from inspect import iscoroutinefunction
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def _dependency_key(name):
+    return f'jobs:pagedep:{name}'
+
+
+def _current_tokens(names):
+    """Current token per dependency; unknown dependencies get a fresh one"""
+    keys = {name: _dependency_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    tokens, missing = {}, {}
+    for name, key in keys.items():
+        if key in found:
+            tokens[name] = found[key]
+        else:
+            tokens[name] = missing[key] = uuid.uuid4().hex
+    if missing:
+        cache.set_many(missing, None)
+    return tokens
+
+
+def purge(*names):
+    cache.delete_many([_dependency_key(name) for name in names])
+
+
+def purge_job(job_id, company_id):
+    """A job changed: its page, its company's page and the listings"""
+    purge(f'job:{job_id}', f'company:{company_id}', 'index')
+
+
+def purge_company(company_id):
+    purge(f'company:{company_id}', 'index')
+
+
+def _timeout(view_name):
+    return getattr(settings, 'PAGE_CACHE_TIMEOUTS', {}).get(view_name, 0)
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        # Pending flash messages are rendered into the page
+        and 'messages' not in request.COOKIES
+    )
+
+
+def _cache_key(view_name, request, params, kwargs):
+    query = urlencode(sorted(
+        (param, value)
+        for param in params
+        for value in request.GET.getlist(param)
+        if value
+    ))
+    args = urlencode(sorted(kwargs.items()))
+    digest = hashlib.md5(f'{args}?{query}'.encode()).hexdigest()
+    return f'jobs:page:{view_name}:{digest}'
+
+
+def _conditional(request, entry, response):
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response,
+    )
+
+
+def _lookup(view_name, request, params, kwargs, dependencies, on_hit):
+    """
+    (cached response or None, cache key, dependency tokens). The tokens are
+    read before rendering so a purge racing with the render invalidates the
+    entry instead of being lost.
+    """
+    key = _cache_key(view_name, request, params, kwargs)
+    entry = cache.get(key)
+    if entry is not None and _current_tokens(entry['deps']) == entry['deps']:
+        if on_hit is not None:
+            on_hit(request, **kwargs)
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['X-Page-Cache'] = 'hit'
+        return _conditional(request, entry, response), key, None
+
+    names = ['index'] if dependencies is None else dependencies(request, **kwargs)
+    return None, key, _current_tokens(names)
+
+
+def _store(request, response, key, tokens, timeout):
+    # Responses setting cookies (CSRF, session, messages) are per-visitor
+    if response.status_code != 200 or response.cookies or response.streaming:
+        return response
+
+    entry = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+        'last_modified': int(time.time()),
+        'deps': tokens,
+    }
+    cache.set(key, entry, timeout)
+    response['X-Page-Cache'] = 'miss'
+    return _conditional(request, entry, response)
+
+
+def cache_anonymous_page(view_name, params=(), dependencies=None, on_hit=None):
+    """
+    Cache a view's anonymous responses for ``PAGE_CACHE_TIMEOUTS[view_name]``.
+
+    ``params`` lists the query parameters the page depends on.
+    ``dependencies(request, **kwargs)`` returns the dependency names of the
+    page, ``['index']`` by default. ``on_hit(request, **kwargs)`` runs when a
+    cached page is served, for side effects the view would otherwise perform.
+    Both are called synchronously, also for async views.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # Resolve the user now: the lazy request.user can't query in async code
+                request.user = await request.auser()
+                timeout = _timeout(view_name)
+                if not timeout or not _is_cacheable_request(request):
+                    return await view_func(request, *args, **kwargs)
+
+                response, key, tokens = await sync_to_async(_lookup)(
+                    view_name, request, params, kwargs, dependencies, on_hit,
+                )
+                if response is not None:
+                    return response
+                response = await view_func(request, *args, **kwargs)
+                return await sync_to_async(_store)(request, response, key, tokens, timeout)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            timeout = _timeout(view_name)
+            if not timeout or not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            response, key, tokens = _lookup(view_name, request, params, kwargs, dependencies, on_hit)
+            if response is not None:
+                return response
+            response = view_func(request, *args, **kwargs)
+            return _store(request, response, key, tokens, timeout)
+        return wrapper
+    return decorator
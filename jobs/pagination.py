@@ -0,0 +1,267 @@
+"""
+Keyset (seek) pagination.
+
+``Paginator`` pages with ``OFFSET`` and recounts the whole result set on every
+request, so deep pages get slower the further you go. ``KeysetPaginator``
+instead remembers the sort key of the last row shown in an opaque cursor and
+asks for the rows after it, which costs the same on page 500 as on page 1
+when the ordering is backed by an index. The "N total" figure comes from a
+short-lived cached count.
+
+``EstimatedCountPaginator`` keeps OFFSET pages (the admin needs page numbers)
+but takes big totals from the PostgreSQL planner instead of ``COUNT(*)``.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder drops microseconds, which breaks seeking
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def _count_key(queryset):
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return f'jobs:count:{queryset.model._meta.label_lower}:{digest}'
+
+
+def _count_timeout(timeout):
+    return getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60) if timeout is None else timeout
+
+
+def cached_count(queryset, timeout=None):
+    """COUNT(*) of a queryset, cached for a short while"""
+    if queryset.query.is_empty():  # .none(), which has no SQL to key on
+        return 0
+    key = _count_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, _count_timeout(timeout))
+    return count
+
+
+async def acached_count(queryset, timeout=None):
+    """Async cached_count()"""
+    if queryset.query.is_empty():
+        return 0
+    key = _count_key(queryset)
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, _count_timeout(timeout))
+    return count
+
+
+def estimated_count(queryset, exact_below=None):
+    """
+    Rows in queryset as estimated by the PostgreSQL planner, when it expects
+    at least exact_below (ADMIN_EXACT_COUNT_LIMIT); otherwise, and on other
+    databases, cached_count().
+    """
+    if exact_below is None:
+        exact_below = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate >= exact_below:
+            return estimate
+    return cached_count(queryset)
+
+
+class EstimatedCountPaginator(Paginator):
+    """A Paginator whose count is estimated_count(), for admin changelists"""
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; quacks enough like a Page for templates"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], 'next')
+        return ''
+
+    @property
+    def previous_cursor(self):
+        # An empty page (a cursor past the end) has no row to step back from
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], 'prev')
+        return ''
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by a unique ordering, e.g. ``('-posted_date', '-id')``.
+
+    The last ordering key must be unique so rows with equal leading keys are
+    neither skipped nor repeated.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in self.ordering]
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = cached_count(self.queryset)
+        return self._count
+
+    async def acount(self):
+        """Fetch the count ahead of rendering, which can't query in async views"""
+        if self._count is None:
+            self._count = await acached_count(self.queryset)
+        return self._count
+
+    # ---- cursors ----
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, name) for name, _ in self.keys]
+        payload = json.dumps({'d': direction, 'k': values}, default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw_values = payload['d'], payload['k']
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if (direction not in ('next', 'prev') or not isinstance(raw_values, list)
+                or len(raw_values) != len(self.keys)):
+            raise InvalidCursor(cursor)
+
+        values = []
+        for (name, _), value in zip(self.keys, raw_values):
+            # Keys are never NULL; a None would only reach the database as an error
+            if value is None:
+                raise InvalidCursor(cursor)
+            try:
+                field = self.queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotation, e.g. a search rank: only plain numbers
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise InvalidCursor(cursor)
+                values.append(value)
+                continue
+            try:
+                values.append(field.to_python(value))
+            except Exception:
+                raise InvalidCursor(cursor)
+            if values[-1] is None:
+                raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(self, values, backwards):
+        """Q selecting rows strictly after (or before) the given key values"""
+        condition = Q()
+        for index, ((name, descending), value) in enumerate(zip(self.keys, values)):
+            lookup = 'lt' if descending != backwards else 'gt'
+            term = Q(**{f'{name}__{lookup}': value})
+            for prev_name, prev_value in zip([n for n, _ in self.keys[:index]], values[:index]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    # ---- pages ----
+
+    def _query(self, cursor):
+        """(queryset for the rows of the page, direction); raises InvalidCursor"""
+        if not cursor:
+            return self.queryset.order_by(*self.ordering)[:self.per_page + 1], None
+
+        direction, values = self.decode_cursor(cursor)
+        if direction == 'next':
+            rows = self.queryset.filter(self._seek(values, False)).order_by(*self.ordering)
+        else:
+            reverse = [key[1:] if key.startswith('-') else f'-{key}' for key in self.ordering]
+            rows = self.queryset.filter(self._seek(values, True)).order_by(*reverse)
+        return rows[:self.per_page + 1], direction
+
+    def _page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction is None:
+            return KeysetPage(rows, self, more, False)
+        if direction == 'next':
+            return KeysetPage(rows, self, more, True)
+        return KeysetPage(rows[::-1], self, True, more)
+
+    def page(self, cursor=None):
+        """Return the page after/before cursor; the first page for no cursor"""
+        queryset, direction = self._query(cursor)
+        return self._page(list(queryset), direction)
+
+    async def apage(self, cursor=None):
+        """Async page()"""
+        queryset, direction = self._query(cursor)
+        return self._page([obj async for obj in queryset], direction)
+
+    def get_page(self, cursor=None):
+        """Like page() but falls back to the first page for a bad cursor"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    async def aget_page(self, cursor=None):
+        """Async get_page()"""
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage()
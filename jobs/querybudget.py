@@ -0,0 +1,185 @@
+"""
+Query budgets and an N+1 detector for the jobs views.
+
+Views declare how many SQL queries a request may take with
+``@query_budget(n)``; ``assert_max_queries`` and ``check_url_budgets`` make a
+test (or ``manage.py check_query_budgets``) fail when a view goes over its
+budget or runs the same query shape over and over, the usual sign of a
+missing ``select_related``/``prefetch_related``. ``check_role_budgets`` requests
+every route as the user it is meant for; jobs.tests runs it.
+
+    from jobs.querybudget import assert_max_queries
+
+    with assert_max_queries(4):
+        client.get(reverse('jobs:dashboard'))
+"""
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, reverse
+
+
+# Queries a view may run when it doesn't declare a budget
+DEFAULT_BUDGET = 10
+
+# The same query shape this many times in one request is reported as N+1
+REPEAT_THRESHOLD = 3
+
+# Routes that only do their work for an employer; check_role_budgets requests
+# them as one, and every other route as a job seeker
+EMPLOYER_ROUTES = frozenset({
+    'create_job', 'edit_job', 'job_applicants', 'employer_applications',
+    'export_employer_applications', 'download_resume',
+})
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def query_budget(max_queries):
+    """Declare the most queries one request to this view may run"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_budget(view_func):
+    return getattr(view_func, 'query_budget', getattr(settings, 'QUERY_BUDGET_DEFAULT', DEFAULT_BUDGET))
+
+
+class QueryRecorder:
+    """Records the SQL run on a connection (default: every database, replicas included) while active"""
+
+    def __init__(self, using=None):
+        self.connections = [using] if using is not None else [connections[alias] for alias in connections]
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in self.connections:
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.__exit__(*exc_info)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """Query shapes (literals stripped) run at least threshold times"""
+        shapes = Counter(_LITERALS.sub('?', sql) for sql in self.queries)
+        return {shape: times for shape, times in shapes.items() if times >= threshold}
+
+    def report(self):
+        return '\n'.join(f'  {index}. {sql}' for index, sql in enumerate(self.queries, 1))
+
+
+@contextmanager
+def assert_max_queries(max_queries, repeat_threshold=REPEAT_THRESHOLD, label='block'):
+    """Fail if the block runs more than max_queries queries or an N+1 pattern"""
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{label} ran {recorder.count} queries, budget is {max_queries}')
+    for shape, times in recorder.repeated(repeat_threshold).items():
+        problems.append(f'{label} ran this query {times} times (N+1?): {shape}')
+    if problems:
+        raise AssertionError('\n'.join(problems) + '\n' + recorder.report())
+
+
+def jobs_url_patterns():
+    """(name, view, pattern) for every route in jobs.urls"""
+    from jobs import urls
+    for pattern in urls.urlpatterns:
+        if isinstance(pattern, URLPattern):
+            yield pattern.name, pattern.callback, pattern
+
+
+def check_url_budgets(client, url_kwargs, skip=('logout',), warm=True, only=None):
+    """
+    GET every jobs route (or those named in only) with client and compare its
+    queries to its budget.
+
+    ``url_kwargs`` maps route names to reverse() kwargs for routes that take
+    arguments; routes missing from it are skipped. With warm, each route is
+    requested once before counting so caches are filled. Returns a list of
+    ``(name, queries, budget, repeated)``; a route is over budget when
+    queries > budget or repeated is non-empty.
+    """
+    results = []
+    for name, view, pattern in jobs_url_patterns():
+        if name in skip or (only is not None and name not in only):
+            continue
+        if pattern.pattern.converters and name not in url_kwargs:
+            continue
+        url = reverse(f'jobs:{name}', kwargs=url_kwargs.get(name))
+        if warm:
+            client.get(url)  # Budgets are for warm caches
+        with QueryRecorder() as recorder:
+            client.get(url)
+        results.append((name, recorder.count, get_budget(view), recorder.repeated()))
+    return results
+
+
+def budget_users(seeker=None, employer=None):
+    """
+    (seeker, employer, job, application) for check_role_budgets: an employer
+    of a company with active jobs, one of those jobs (preferably posted by
+    them, then one with applicants), an application to the company (or
+    None) and a job seeker with applications. None if there is no such
+    employer or seeker.
+    """
+    from django.contrib.auth.models import User
+    from jobs.models import Application, Job, UserProfile
+    profiles = UserProfile.objects.filter(is_employer=True, company__jobs__is_active=True)
+    if employer is not None:
+        profiles = profiles.filter(user=employer)
+    profile = profiles.select_related('user').order_by('pk').first()
+    if seeker is None:
+        seeker = (
+            User.objects.filter(applications__isnull=False, is_staff=False)
+            .exclude(userprofile__is_employer=True).order_by('pk').first()
+        )
+    if profile is None or seeker is None:
+        return None
+
+    jobs = Job.objects.filter(company_id=profile.company_id, is_active=True).order_by('-posted_date', '-id')
+    job = (
+        jobs.filter(posted_by=profile.user).first()
+        or jobs.filter(applications__isnull=False).first()
+        or jobs.first()
+    )
+    application = Application.objects.filter(job__company_id=profile.company_id).order_by('pk').first()
+    return seeker, profile.user, job, application
+
+
+def check_role_budgets(seeker, employer, job, application):
+    """check_url_budgets() for every route, the EMPLOYER_ROUTES as employer and the rest as seeker"""
+    from django.test import Client
+    url_kwargs = {
+        'job_detail': {'pk': job.pk},
+        'company_detail': {'pk': job.company_id},
+        'edit_job': {'pk': job.pk},
+        'apply_job': {'pk': job.pk},
+        'toggle_bookmark': {'pk': job.pk},
+        'job_applicants': {'pk': job.pk},
+    }
+    if application is not None:
+        url_kwargs['download_resume'] = {'pk': application.pk}
+    all_routes = {name for name, _, _ in jobs_url_patterns()}
+    results = []
+    for user, routes in ((seeker, all_routes - EMPLOYER_ROUTES), (employer, EMPLOYER_ROUTES)):
+        client = Client()
+        client.force_login(user)
+        results += check_url_budgets(client, url_kwargs, only=routes)
+    return results
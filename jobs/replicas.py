@@ -0,0 +1,123 @@
+"""
+Read-replica routing.
+
+Databases listed in ``DATABASE_REPLICA_URLS`` are added as ``replica_1``,
+``replica_2``... Reads go to a replica only where that was asked for: inside
+views decorated with ``@read_replica`` and inside ``with reading():`` blocks
+(facet counts). Everything else, and every write, uses ``default``.
+
+Replicas lag behind the primary, so a user who just wrote would not see the
+write on the next page. ``ReplicaMiddleware`` notes when a request wrote and
+sets a cookie that pins that browser to the primary for
+``REPLICA_STICKY_SECONDS``; a toggled bookmark then shows in ``my_bookmarks``
+right away. Reads inside a transaction on the primary stay on the primary too.
+The database cache always uses the primary, and cache writes don't pin.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+STICKY_COOKIE = 'pin_primary'
+
+_state = contextvars.ContextVar('jobs_replica_state', default=None)
+
+
+class RoutingState:
+    """Per request (or per ``reading()`` block): where reads go and whether anything was written"""
+
+    __slots__ = ('replica', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.replica = None
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def start_request(pinned):
+    state = RoutingState(pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+@contextmanager
+def reading():
+    """Send the reads of this block to a replica (unless pinned to the primary)"""
+    state = _state.get()
+    if state is None:
+        state, token = start_request(pinned=False)
+    else:
+        token = None
+    previous = state.replica
+    if previous is None and not state.pinned and (aliases := replica_aliases()):
+        # One replica for the whole block, so a page's queries agree with each other
+        state.replica = random.choice(aliases)
+    try:
+        yield state
+    finally:
+        state.replica = previous
+        if token is not None:
+            end_request(token)
+
+
+def read_replica(view_func):
+    """Serve this read-only view's queries from a replica"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            # Queries run in sync_to_async threads, which copy this context
+            with reading():
+                return await view_func(request, *args, **kwargs)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with reading():
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+# The database cache's table (CACHE_BACKEND=db). It lives on the primary and
+# isn't data a page shows, so writing to it doesn't pin the browser
+CACHE_APP_LABEL = 'django_cache'
+
+
+class ReplicaRouter:
+    """Reads to the current replica, if any; writes, migrations and the database cache to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            # A lagging replica would serve entries that were already replaced
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None or state.replica is None or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Read what this transaction has written
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label != CACHE_APP_LABEL:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db == DEFAULT_DB_ALIAS
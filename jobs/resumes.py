@@ -0,0 +1,149 @@
+"""
+Resume upload and storage.
+
+``ResumeUploadHandler``, installed by the apply view only (admin and other
+uploads keep Django's handlers), streams the ``resume`` field of a multipart
+upload to a temporary file chunk by chunk, hashing it as it goes and rejecting it as
+soon as it is too large or doesn't look like an allowed document type.
+``store_resume`` then files it content-addressed under
+``resumes/<sha256[:2]>/<sha256>.<ext>``, so the same PDF sent to fifty jobs
+is stored once. ``resume_response`` serves a stored file with FileResponse,
+which hands it to the server's sendfile/file_wrapper instead of reading it
+into Python.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.http import FileResponse, Http404
+
+
+FIELD_NAME = 'resume'
+
+# Extension -> leading bytes of a file of that type
+SIGNATURES = {
+    '.pdf': (b'%PDF',),
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    '.docx': (b'PK\x03\x04',),
+}
+
+
+def max_size():
+    return getattr(settings, 'RESUME_MAX_UPLOAD_SIZE', 5 * 1024 * 1024)
+
+
+def allowed_extensions():
+    return getattr(settings, 'RESUME_ALLOWED_EXTENSIONS', tuple(SIGNATURES))
+
+
+class ResumeUploadHandler(FileUploadHandler):
+    """
+    Streams the resume field to disk with size/type checks and a running hash.
+
+    Other file fields are passed on to the next handler. Rejections are
+    recorded on ``request.resume_upload_error`` for the view to report.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Whole request larger than the limit (plus room for the form fields):
+        # reject the resume without writing any of it
+        self.too_large = content_length is not None and content_length > max_size() + 64 * 1024
+        self.active = False
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != FIELD_NAME:
+            self.active = False
+            return
+
+        self.active = True
+        self.extension = os.path.splitext(file_name)[1].lower()
+        if self.extension not in allowed_extensions():
+            self._reject(f'Resume must be one of: {", ".join(allowed_extensions())}.')
+        if self.too_large:
+            self._reject(f'Resume must be smaller than {max_size() // (1024 * 1024)} MB.')
+
+        self.file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.checked_signature = False
+        raise StopFutureHandlers()
+
+    def _reject(self, error):
+        self.active = False
+        self.request.resume_upload_error = error
+        raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if not self.checked_signature:
+            self.checked_signature = True
+            signatures = SIGNATURES.get(self.extension, ())
+            if signatures and not raw_data.startswith(signatures):
+                self.file.close()
+                self._reject('The resume file does not match its extension.')
+
+        self.size += len(raw_data)
+        if self.size > max_size():
+            self.file.close()
+            self._reject(f'Resume must be smaller than {max_size() // (1024 * 1024)} MB.')
+
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'active', False):
+            self.file.close()
+
+
+def content_name(digest, extension):
+    return f'resumes/{digest[:2]}/{digest}{extension}'
+
+
+def store_resume(uploaded_file):
+    """
+    Store an uploaded resume by content hash and return its storage name.
+    Identical files share one stored copy.
+    """
+    digest = getattr(uploaded_file, 'sha256', None)
+    if digest is None:
+        # Not streamed through ResumeUploadHandler (e.g. in tests or scripts)
+        hasher = hashlib.sha256()
+        for chunk in uploaded_file.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        uploaded_file.seek(0)
+
+    name = content_name(digest, os.path.splitext(uploaded_file.name)[1].lower())
+    if default_storage.exists(name):
+        return name
+    # FileSystemStorage moves a TemporaryUploadedFile into place without copying
+    return default_storage.save(name, uploaded_file)
+
+
+def resume_response(application):
+    """Stream an application's resume as an attachment; 404 if it has none or the file is gone"""
+    if not application.resume:
+        raise Http404('This application has no resume.')
+    extension = os.path.splitext(application.resume.name)[1]
+    filename = f'{application.user.username}-resume{extension}'
+    try:
+        resume = application.resume.open('rb')
+    except FileNotFoundError:
+        raise Http404('The resume file is missing.')
+    return FileResponse(resume, as_attachment=True, filename=filename)
@@ -0,0 +1,182 @@
+"""
+Full-text search index for job listings.
+
+Jobs are indexed over title, company name, location, description and
+requirements. Inactive jobs are indexed too, for the admin; the site's
+search filters them out. On SQLite the index is an FTS5 virtual table, on PostgreSQL a
+side table holding a weighted tsvector behind a GIN index. Any other backend
+falls back to the old ``icontains`` search.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Job, Company
+
+
+SQLITE_TABLE = 'jobs_job_fts'
+POSTGRES_TABLE = 'jobs_job_search'
+
+# Fields whose changes require a job to be re-indexed
+INDEXED_JOB_FIELDS = {'title', 'company', 'location', 'description', 'requirements'}
+INDEXED_COMPANY_FIELDS = {'name'}
+
+# Column weights: title, company, location, description, requirements
+SQLITE_WEIGHTS = '10.0, 5.0, 5.0, 1.0, 1.0'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported(vendor=None):
+    """Return True if the database backend has a full-text index"""
+    return (vendor or connection.vendor) in ('sqlite', 'postgresql')
+
+
+def tokenize(query):
+    """Split a raw search box value into safe search terms"""
+    return TOKEN_RE.findall(query.lower())[:10]
+
+
+def _sqlite_match(terms):
+    # Every term is quoted (no FTS5 operators leak through) and prefix-matched
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _postgres_tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+class _JobRawSQL(RawSQL):
+    """RawSQL in which {job_id} is the job id column, under the alias the query gives the Job table"""
+
+    def as_sql(self, compiler, connection):
+        table = compiler.quote_name_unless_alias(compiler.query.base_table)
+        job_id = f'{table}.{connection.ops.quote_name("id")}'
+        return f'({self.sql.format(job_id=job_id)})', self.params
+
+
+def filter_jobs(queryset, query):
+    """
+    Restrict a Job queryset to jobs matching query, ordered by relevance.
+    Every result carries a search_rank (lower is better) to order and page by.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0))
+
+    if not is_supported():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(company__name__icontains=query) |
+            Q(location__icontains=query)
+        ).annotate(search_rank=Value(0.0)).order_by('-posted_date')
+
+    if connection.vendor == 'sqlite':
+        match = _sqlite_match(terms)
+        ids_sql = f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s'
+        # The matches are ranked once, not with a MATCH per job, which is
+        # quadratic in the number of matches
+        rank_sql = (
+            f'WITH ranks AS MATERIALIZED ('
+            f'SELECT rowid AS job_id, bm25({SQLITE_TABLE}, {SQLITE_WEIGHTS}) AS rank '
+            f'FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s) '
+            f'SELECT rank FROM ranks WHERE job_id = {{job_id}}'
+        )
+    else:
+        match = _postgres_tsquery(terms)
+        ids_sql = (
+            f"SELECT job_id FROM {POSTGRES_TABLE} "
+            f"WHERE document @@ to_tsquery('english', %s)"
+        )
+        # Negated so that, as with bm25, lower is better
+        rank_sql = (
+            f"SELECT -ts_rank(document, to_tsquery('english', %s)) FROM {POSTGRES_TABLE} "
+            f"WHERE job_id = {{job_id}}"
+        )
+
+    # Matching doesn't refer to the outer query, so the result also works as
+    # a subquery (e.g. job__in=filter_jobs(...).values('pk'))
+    return queryset.filter(
+        id__in=RawSQL(ids_sql, [match])
+    ).annotate(
+        search_rank=_JobRawSQL(rank_sql, [match])
+    ).order_by('search_rank', '-posted_date')
+
+
+# ==================== Index maintenance ====================
+
+def _reindex(where, params):
+    """Rebuild index rows for the jobs selected by a WHERE clause on alias j"""
+    job_table = Job._meta.db_table
+    company_table = Company._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN (SELECT j.id FROM {job_table} j WHERE {where})',
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, company, location, description, requirements) "
+                f"SELECT j.id, j.title, c.name, j.location, j.description, COALESCE(j.requirements, '') "
+                f"FROM {job_table} j JOIN {company_table} c ON c.id = j.company_id "
+                f"WHERE {where}",
+                params,
+            )
+        else:
+            cursor.execute(
+                f'DELETE FROM {POSTGRES_TABLE} WHERE job_id IN (SELECT j.id FROM {job_table} j WHERE {where})',
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (job_id, document) "
+                f"SELECT j.id, "
+                f"setweight(to_tsvector('english', j.title), 'A') || "
+                f"setweight(to_tsvector('english', c.name), 'B') || "
+                f"setweight(to_tsvector('english', j.location), 'B') || "
+                f"setweight(to_tsvector('english', j.description), 'C') || "
+                f"setweight(to_tsvector('english', COALESCE(j.requirements, '')), 'D') "
+                f"FROM {job_table} j JOIN {company_table} c ON c.id = j.company_id "
+                f"WHERE {where}",
+                params,
+            )
+
+
+def index_job(job_id):
+    """(Re)index a single job"""
+    if is_supported():
+        _reindex('j.id = %s', [job_id])
+
+
+def index_company_jobs(company_id):
+    """Re-index every job of a company, e.g. after it was renamed"""
+    if is_supported():
+        _reindex('j.company_id = %s', [company_id])
+
+
+def remove_job(job_id):
+    """Drop a deleted job from the index"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [job_id])
+        else:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE job_id = %s', [job_id])
+
+
+def rebuild_index():
+    """Rebuild the whole index from the Job table"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+        else:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+    _reindex('1 = 1', [])
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}) VALUES ('optimize')")
@@ -0,0 +1,255 @@
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from . import counters, facets, fragments, leaderboards, page_cache, search, stats, user_jobs
+from .models import Job, Company, Application, Bookmark, CompanyStats
+
+
+def _touches(update_fields, fields):
+    """True unless the save was restricted to fields we don't care about"""
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+# ==================== Search index ====================
+
+@receiver(post_save, sender=Job)
+def index_job_on_save(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text index in sync with job edits"""
+    if _touches(update_fields, search.INDEXED_JOB_FIELDS):
+        search.index_job(instance.pk)
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_from_index(sender, instance, **kwargs):
+    search.remove_job(instance.pk)
+
+
+@receiver(post_save, sender=Company)
+def reindex_company_jobs(sender, instance, created, update_fields=None, **kwargs):
+    """A renamed company changes the indexed text of all of its jobs"""
+    if not created and _touches(update_fields, search.INDEXED_COMPANY_FIELDS):
+        search.index_company_jobs(instance.pk)
+
+
+# ==================== Job state before a save ====================
+
+# Saved fields the facet counts, company stats and related jobs depend on
+STATE_FIELDS = set(facets.STATE_FIELDS) | {'company', 'company_id', 'is_active'}
+
+
+@receiver(pre_save, sender=Job)
+def capture_saved_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    The stored state of an edited job, as _facet_state and _stats_state, read
+    with one query when the save can change it (None otherwise, or if unknown)
+    """
+    instance._facet_state = instance._stats_state = None
+    if raw or instance._state.adding or instance.pk is None or not _touches(update_fields, STATE_FIELDS):
+        return
+    fields = set(facets.STATE_FIELDS) | set(stats.JOB_STATE_FIELDS)
+    row = Job.objects.filter(pk=instance.pk).values(*fields).first()
+    if row is not None:
+        instance._facet_state = tuple(row[field] for field in facets.STATE_FIELDS)
+        instance._stats_state = tuple(row[field] for field in stats.JOB_STATE_FIELDS)
+
+
+# ==================== Facet counts ====================
+
+@receiver(post_save, sender=Job)
+def update_facets_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if not _touches(update_fields, set(facets.STATE_FIELDS)):
+        return
+    old_state = None if created else instance._facet_state
+    new_state = facets.capture_state(instance)
+    # Once committed, so a rolled back save leaves the counts alone
+    if new_state is None or (old_state is None and not created):
+        transaction.on_commit(facets.invalidate)
+    else:
+        transaction.on_commit(lambda: facets.apply_change(old_state, new_state))
+
+
+@receiver(post_delete, sender=Job)
+def update_facets_on_delete(sender, instance, **kwargs):
+    old_state = facets.capture_state(instance)
+    if old_state is None:
+        transaction.on_commit(facets.invalidate)
+    else:
+        transaction.on_commit(lambda: facets.apply_change(old_state, None))
+
+
+# ==================== Template fragments ====================
+# Invalidated once the write commits: earlier, a request could cache the
+# old rows again before the commit, and a rollback would invalidate for nothing
+
+@receiver(post_save, sender=Job)
+def bump_job_fragments(sender, instance, update_fields=None, **kwargs):
+    # views_count is rendered outside the fragments
+    if update_fields is None or set(update_fields) - {'views_count'}:
+        job_id = instance.pk
+        transaction.on_commit(lambda: fragments.bump('job', job_id))
+
+
+@receiver(post_save, sender=Company)
+def bump_company_fragments(sender, instance, **kwargs):
+    company_id = instance.pk
+    transaction.on_commit(lambda: fragments.bump('company', company_id))
+
+
+# ==================== Anonymous page cache ====================
+
+@receiver(post_save, sender=Job)
+def purge_job_pages(sender, instance, update_fields=None, **kwargs):
+    # View counts on cached pages may lag until the entry expires
+    if update_fields is None or set(update_fields) - {'views_count'}:
+        job_id, company_id = instance.pk, instance.company_id
+        transaction.on_commit(lambda: page_cache.purge_job(job_id, company_id))
+
+
+@receiver(post_delete, sender=Job)
+def purge_deleted_job_pages(sender, instance, **kwargs):
+    job_id, company_id = instance.pk, instance.company_id
+    transaction.on_commit(lambda: page_cache.purge_job(job_id, company_id))
+
+
+@receiver(post_save, sender=Company)
+def purge_company_pages(sender, instance, **kwargs):
+    company_id = instance.pk
+    transaction.on_commit(lambda: page_cache.purge_company(company_id))
+
+
+# ==================== Related jobs ====================
+
+@receiver(post_save, sender=Job)
+def invalidate_related_jobs_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) - {'views_count'}:
+        company_ids = {instance.company_id}
+        old_state = getattr(instance, '_stats_state', None)
+        if old_state is not None:
+            company_ids.add(old_state[0])
+
+        def invalidate():
+            for company_id in company_ids:
+                stats.invalidate_related_jobs(company_id)
+
+        # After commit, like the fragment and page purges
+        transaction.on_commit(invalidate)
+
+
+@receiver(post_delete, sender=Job)
+def invalidate_related_jobs_on_delete(sender, instance, **kwargs):
+    company_id = instance.company_id
+    transaction.on_commit(lambda: stats.invalidate_related_jobs(company_id))
+
+
+# ==================== Leaderboards ====================
+
+# Updated once committed, like the other caches
+
+@receiver(post_save, sender=Job)
+def update_leaderboards_on_save(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, set(leaderboards.JOB_FIELDS) | {'company', 'is_active'}):
+        transaction.on_commit(lambda: leaderboards.job_saved(instance))
+
+
+@receiver(post_delete, sender=Job)
+def update_leaderboards_on_delete(sender, instance, **kwargs):
+    job_id = instance.pk
+    transaction.on_commit(lambda: leaderboards.job_deleted(job_id))
+
+
+@receiver(post_save, sender=Company)
+def refresh_leaderboards_on_company_save(sender, instance, created, **kwargs):
+    # The boards show company names; renames are rare, so rebuild them
+    if not created:
+        transaction.on_commit(leaderboards.invalidate)
+
+
+# ==================== User job sets ====================
+# Bookmark deletes are reported by the views and the admin instead: a
+# post_delete receiver would turn every bulk unbookmark into a SELECT and
+# per-row signals
+
+@receiver(post_save, sender=Bookmark)
+def add_bookmarked_job(sender, instance, created, **kwargs):
+    if created:
+        user_jobs.add(instance.user_id, user_jobs.BOOKMARKED, [instance.job_id])
+
+
+@receiver(post_save, sender=Application)
+def add_applied_job(sender, instance, created, **kwargs):
+    if created:
+        user_jobs.add(instance.user_id, user_jobs.APPLIED, [instance.job_id])
+
+
+@receiver(post_delete, sender=Application)
+def remove_applied_job(sender, instance, **kwargs):
+    user_jobs.remove(instance.user_id, user_jobs.APPLIED, [instance.job_id])
+
+
+# ==================== Cache table ====================
+
+@receiver(post_migrate)
+def create_cache_table(sender, using, **kwargs):
+    # The database cache's table (CACHE_BACKEND=db), so a deploy that runs migrate has it
+    if sender.name == 'jobs':
+        call_command('createcachetable', database=using, verbosity=0)
+
+
+# ==================== View counter ====================
+
+@receiver(request_finished)
+def flush_view_counts(sender, **kwargs):
+    # After the response has been sent, so the UPDATE never delays a page
+    counters.flush_if_due()
+
+
+# ==================== Company stats ====================
+
+@receiver(post_save, sender=Job)
+def update_company_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    new_state = stats.capture_job_state(instance)
+    if created:
+        stats.adjust_company_stats(
+            instance.company_id, active_jobs=int(instance.is_active), total_views=instance.views_count,
+        )
+    elif _touches(update_fields, {'company', 'is_active'}):
+        old_state = instance._stats_state
+        if old_state is None or new_state is None:
+            stats.refresh_company_stats(instance.company_id)
+        elif old_state[0] != new_state[0]:
+            # Moved to another company: both totals change
+            stats.refresh_company_stats(old_state[0])
+            stats.refresh_company_stats(new_state[0])
+        else:
+            stats.adjust_company_stats(instance.company_id, active_jobs=int(new_state[1]) - int(old_state[1]))
+
+
+@receiver(post_delete, sender=Job)
+def update_company_stats_on_delete(sender, instance, **kwargs):
+    state = stats.capture_job_state(instance)
+    if state is None:
+        stats.refresh_company_stats(instance.company_id)
+    else:
+        stats.adjust_company_stats(state[0], active_jobs=-int(state[1]), total_views=-state[2])
+
+
+@receiver(post_save, sender=Application)
+def count_application(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust_application_count(instance.job_id, 1)
+
+
+@receiver(post_delete, sender=Application)
+def uncount_application(sender, instance, **kwargs):
+    # Applications cascade-deleted with their job go before the job row,
+    # so the company can still be looked up
+    stats.adjust_application_count(instance.job_id, -1)
+
+
+@receiver(post_save, sender=Company)
+def create_company_stats(sender, instance, created, **kwargs):
+    if created:
+        CompanyStats.objects.get_or_create(company=instance)
@@ -127,50 +127,114 @@ function trackApplicationStatus(applicationId, newStatus) {
 }
 
 // ==================== Bookmark Management ====================
-function toggleBookmark(jobId) {
-    fetch(`/job/${jobId}/bookmark/`, {
+// Bookmark buttons carry data-bookmark-job and data-bookmarked. A click
+// updates the button at once; clicks within BOOKMARK_DELAY ms are sent
+// together to /api/bookmarks/, and clicking a job twice cancels out.
+const BOOKMARK_DELAY = 400;
+const pendingBookmarks = new Map();  // job id -> wanted state
+let bookmarkTimer = null;
+
+function showBookmark(jobId, isBookmarked) {
+    document.querySelectorAll(`[data-bookmark-job="${jobId}"]`).forEach(button => {
+        button.dataset.bookmarked = isBookmarked ? 'true' : 'false';
+        button.innerHTML = isBookmarked
+            ? (button.dataset.labelOn || '❤️ Bookmarked')
+            : (button.dataset.labelOff || '🤍 Bookmark');
+    });
+}
+
+function sendBookmarks(changes) {
+    const body = { add: [], remove: [] };
+    changes.forEach((wanted, jobId) => body[wanted ? 'add' : 'remove'].push(Number(jobId)));
+    return fetch('/api/bookmarks/', {
         method: 'POST',
         headers: {
+            'Content-Type': 'application/json',
             'X-Requested-With': 'XMLHttpRequest',
             'X-CSRFToken': getCookie('csrftoken')
-        }
+        },
+        body: JSON.stringify(body),
+        keepalive: true  // Still sent when the page is being left
     })
-    .then(response => response.json())
+    .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+    });
+}
+
+function flushBookmarks() {
+    clearTimeout(bookmarkTimer);
+    bookmarkTimer = null;
+    if (pendingBookmarks.size === 0) return;
+    const batch = new Map(pendingBookmarks);
+    pendingBookmarks.clear();
+
+    sendBookmarks(batch)
     .then(data => {
-        const button = event.target.closest('button');
-        if (button) {
-            if (data.is_bookmarked) {
-                button.innerHTML = '❤️ Bookmarked';
-                button.style.color = '#e74c3c';
-            } else {
-                button.innerHTML = '🤍 Bookmark';
-                button.style.color = '';
-            }
-        }
+        Object.entries(data.bookmarks).forEach(([jobId, isBookmarked]) => {
+            // A click made since is newer than this answer
+            if (!pendingBookmarks.has(jobId)) showBookmark(jobId, isBookmarked);
+        });
     })
     .catch(error => {
         console.error('Error:', error);
-        alert('Failed to toggle bookmark');
+        batch.forEach((wanted, jobId) => {
+            if (!pendingBookmarks.has(jobId)) showBookmark(jobId, !wanted);
+        });
+        alert('Failed to update bookmarks');
     });
 }
 
-function removeBookmark(jobId) {
+function toggleBookmark(button) {
+    const jobId = button.dataset.bookmarkJob;
+    const wanted = button.dataset.bookmarked !== 'true';
+    showBookmark(jobId, wanted);
+    if (pendingBookmarks.has(jobId)) {
+        pendingBookmarks.delete(jobId);  // Back to what the server has
+    } else {
+        pendingBookmarks.set(jobId, wanted);
+    }
+    clearTimeout(bookmarkTimer);
+    bookmarkTimer = setTimeout(flushBookmarks, BOOKMARK_DELAY);
+}
+
+document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-bookmark-job]');
+    if (button) {
+        e.preventDefault();
+        toggleBookmark(button);
+    }
+});
+
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') flushBookmarks();
+});
+
+function removeBookmark(jobId, button) {
     if (confirm('Remove this bookmark?')) {
-        fetch(`/job/${jobId}/bookmark/`, {
-            method: 'POST',
-            headers: {
-                'X-Requested-With': 'XMLHttpRequest',
-                'X-CSRFToken': getCookie('csrftoken')
+        sendBookmarks(new Map([[String(jobId), false]]))
+        .then(() => {
+            const card = button && button.closest('.bookmark-card');
+            if (card) {
+                card.remove();
+            } else {
+                location.reload();
             }
         })
-        .then(response => response.json())
-        .then(data => {
-            location.reload();
-        })
         .catch(error => console.error('Error:', error));
     }
 }
 
+// ==================== Applicant Triage ====================
+const selectAllApplicants = document.getElementById('selectAllApplicants');
+if (selectAllApplicants) {
+    selectAllApplicants.addEventListener('change', function() {
+        document.querySelectorAll('.applicant-checkbox').forEach(checkbox => {
+            checkbox.checked = selectAllApplicants.checked;
+        });
+    });
+}
+
 // ==================== CSRF Token Utility ====================
 function getCookie(name) {
     let cookieValue = null;
@@ -0,0 +1,196 @@
+"""
+Aggregates shown on the dashboard and company pages.
+
+Company pages read ``CompanyStats`` rows instead of counting a large
+employer's jobs and applications on every view. The rows are adjusted with
+``F()`` updates from the Job/Application signals and from the view counter
+flush; ``rebuild_company_stats`` recomputes them in bulk.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .caching import Namespace
+from .models import Job, Application, Bookmark, Company, CompanyStats
+
+
+def _count_subquery(queryset):
+    """Correlated COUNT(*) of queryset rows, 0 when there are none"""
+    counted = queryset.order_by().values('user').annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def _user_stats_query(user):
+    statuses = [status for status, _ in Application.STATUS_CHOICES]
+    annotations = {
+        f'status_{index}': _count_subquery(Application.objects.filter(user=OuterRef('pk'), status=status))
+        for index, status in enumerate(statuses)
+    }
+    return User.objects.filter(pk=user.pk).annotate(
+        bookmarks_count=_count_subquery(Bookmark.objects.filter(user=OuterRef('pk'))),
+        **annotations,
+    ).values('bookmarks_count', 'userprofile__is_employer', *annotations)
+
+
+def _user_stats(row):
+    statuses = [status for status, _ in Application.STATUS_CHOICES]
+    applied_jobs = [
+        {'status': status, 'count': row[f'status_{index}']}
+        for index, status in enumerate(statuses)
+        if row[f'status_{index}']
+    ]
+    return {
+        'applications_count': sum(item['count'] for item in applied_jobs),
+        'bookmarks_count': row['bookmarks_count'],
+        'applied_jobs': applied_jobs,
+        'is_employer': bool(row['userprofile__is_employer']),
+    }
+
+
+def get_user_stats(user):
+    """
+    Application and bookmark counts for a user in a single query.
+
+    Returns ``applications_count``, ``bookmarks_count``, ``applied_jobs``
+    (a list of ``{'status': ..., 'count': ...}`` for statuses in use) and
+    ``is_employer``.
+    """
+    return _user_stats(_user_stats_query(user).get())
+
+
+async def aget_user_stats(user):
+    """Async get_user_stats()"""
+    return _user_stats(await _user_stats_query(user).aget())
+
+
+_company_jobs = Namespace('company-jobs', timeout=lambda: getattr(settings, 'RELATED_JOBS_CACHE_TIMEOUT', 3600))
+
+
+def related_jobs(job, limit=3):
+    """
+    Other active jobs of the job's company, newest first. Each company's
+    newest jobs are cached as one list shared by all of its job pages.
+    """
+    jobs = _company_jobs.get_or_set(job.company_id, _company_jobs_query(job, limit))
+    return [other for other in jobs if other.pk != job.pk][:limit]
+
+
+async def arelated_jobs(job, limit=3):
+    """Async related_jobs()"""
+    jobs = await _company_jobs.aget_or_set(job.company_id, _company_jobs_query(job, limit))
+    return [other for other in jobs if other.pk != job.pk][:limit]
+
+
+def _company_jobs_query(job, limit):
+    # One extra, to still have limit after leaving out the job itself
+    return lambda: list(
+        Job.objects.filter(company_id=job.company_id, is_active=True)
+        .only('id', 'company_id', 'title', 'location', 'job_type')
+        .order_by('-posted_date', '-id')[:limit + 1]
+    )
+
+
+def invalidate_related_jobs(company_id):
+    _company_jobs.delete(company_id)
+
+
+# ==================== Company stats ====================
+
+# Job state the company stats depend on, read before a job is saved
+JOB_STATE_FIELDS = ('company_id', 'is_active', 'views_count')
+
+
+def capture_job_state(job):
+    """Snapshot of the fields company stats depend on, or None if any are deferred"""
+    if any(field not in job.__dict__ for field in JOB_STATE_FIELDS):
+        return None
+    return tuple(job.__dict__[field] for field in JOB_STATE_FIELDS)
+
+
+def adjust_company_stats(company_id, **deltas):
+    """Add deltas (active_jobs=1, total_views=-20, ...) to a company's stats row"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or company_id is None:
+        return
+    updated = CompanyStats.objects.filter(company_id=company_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        refresh_company_stats(company_id)
+
+
+def adjust_application_count(job_id, delta):
+    """+/-1 application for the company of job_id, without loading the job"""
+    CompanyStats.objects.filter(
+        company_id=Subquery(Job.objects.filter(pk=job_id).values('company_id')[:1])
+    ).update(total_applications=F('total_applications') + delta)
+
+
+def add_views(job_counts):
+    """Add flushed job view counts ({job_id: views}) to the companies' totals"""
+    per_company = {}
+    for job_id, company_id in Job.objects.filter(pk__in=list(job_counts)).values_list('pk', 'company_id'):
+        per_company[company_id] = per_company.get(company_id, 0) + job_counts[job_id]
+    if per_company:
+        CompanyStats.objects.filter(company_id__in=list(per_company)).update(
+            total_views=F('total_views') + Case(
+                *[When(company_id=company_id, then=Value(views)) for company_id, views in per_company.items()],
+                default=Value(0),
+            )
+        )
+
+
+def compute_company_stats(company_ids=None):
+    """Recount stats from the source tables; returns unsaved CompanyStats"""
+    companies = Company.objects.order_by()
+    applications = Application.objects.order_by()
+    if company_ids is not None:
+        companies = companies.filter(pk__in=company_ids)
+        applications = applications.filter(job__company_id__in=company_ids)
+
+    application_counts = dict(applications.values_list('job__company').annotate(count=Count('id')))
+    companies = companies.annotate(
+        active_count=Count('jobs', filter=Q(jobs__is_active=True)),
+        views_sum=Sum('jobs__views_count'),
+    ).values_list('pk', 'active_count', 'views_sum')
+    return [
+        CompanyStats(
+            company_id=pk,
+            active_jobs=active_count,
+            total_applications=application_counts.get(pk, 0),
+            total_views=views_sum or 0,
+        )
+        for pk, active_count, views_sum in companies.iterator()
+    ]
+
+
+def _upsert(rows, batch_size=1000):
+    CompanyStats.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['company'],
+        update_fields=['active_jobs', 'total_applications', 'total_views', 'updated_date'],
+    )
+
+
+def refresh_company_stats(company_id):
+    """Recompute one company's stats row"""
+    _upsert(compute_company_stats([company_id]))
+
+
+def rebuild_company_stats(batch_size=1000):
+    """Recompute every company's stats row; returns the number of rows written"""
+    rows = compute_company_stats()
+    _upsert(rows, batch_size)
+    return len(rows)
+
+
+def get_company_stats(company):
+    """A company's stats row, created on first use"""
+    try:
+        return company.stats
+    except CompanyStats.DoesNotExist:
+        refresh_company_stats(company.pk)
+        return CompanyStats.objects.get(company=company)
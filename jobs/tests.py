@@ -0,0 +1,757 @@
+import base64
+import csv
+import json
+import os
+import shutil
+import tempfile
+import smtplib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import checks, counters, exports, facets, leaderboards, outbox, replicas, search, triage, user_jobs
+from .admin import JobSearchAdmin
+from .middleware import ReplicaMiddleware
+from .models import (
+    Application, ApplicationStatusChange, Bookmark, Company, CompanyStats, Job, JobDailyViews, OutboundEmail,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .querybudget import assert_max_queries, budget_users, check_role_budgets
+
+
+def clear_caches():
+    """Empty every cache; locmem caches outlive the test transactions"""
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def make_company(name='Acme', **fields):
+    return Company.objects.create(name=name, description='-', location='Remote', **fields)
+
+
+def make_job(company, title='Python Developer', **fields):
+    fields = {'location': 'Remote', 'description': '-', **fields}
+    return Job.objects.create(company=company, title=title, **fields)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The sample companies and jobs, then generated users, jobs and activity
+        call_command('populate_jobs', stdout=StringIO())
+        call_command('populate_jobs', users=20, jobs=30, applications=40, bookmarks=20, stdout=StringIO())
+
+    def setUp(self):
+        # Write the views the requests count while the test database exists
+        self.addCleanup(counters.flush)
+
+    def test_views_stay_within_budget(self):
+        users = budget_users()
+        self.assertIsNotNone(users, 'populate_jobs created no employer or job seeker with applications')
+        for name, queries, budget, repeated in check_role_budgets(*users):
+            with self.subTest(view=name):
+                self.assertLessEqual(queries, budget, f'{name} ran {queries} queries, budget is {budget}')
+                self.assertFalse(repeated, f'{name} repeats queries (N+1?): {repeated}')
+
+    def test_assert_max_queries_catches_repeated_queries(self):
+        with self.assertRaisesMessage(AssertionError, 'N+1?'):
+            with assert_max_queries(10):
+                for user in User.objects.all()[:3]:
+                    User.objects.filter(pk=user.pk).exists()
+
+    def test_assert_max_queries_catches_going_over(self):
+        with self.assertRaisesMessage(AssertionError, 'budget is 1'):
+            with assert_max_queries(1):
+                User.objects.count()
+                User.objects.exists()
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_jobs', stdout=StringIO())
+        call_command('populate_jobs', users=10, jobs=30, applications=20, bookmarks=10, stdout=StringIO())
+
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        try:
+            call_command('check_query_plans', verbosity=2, stdout=output)
+        except CommandError as error:
+            self.fail(f'{error}\n{output.getvalue()}')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_jobs', stdout=StringIO())
+        call_command('populate_jobs', users=10, jobs=60, applications=60, stdout=StringIO())
+
+    def test_results_are_ranked(self):
+        ranks = [job.search_rank for job in search.filter_jobs(Job.objects.all(), 'python developer')]
+        self.assertTrue(ranks)
+        self.assertEqual(ranks, sorted(ranks))
+
+    def test_works_as_subquery(self):
+        matching = search.filter_jobs(Job.objects.all(), 'python')
+        job_ids = set(matching.values_list('pk', flat=True))
+        self.assertTrue(job_ids)
+        expected = set(Application.objects.filter(job_id__in=job_ids).values_list('pk', flat=True))
+        self.assertTrue(expected)
+        for jobs in (matching.values('pk'), matching):
+            with self.subTest(jobs=jobs.query.values_select):
+                found = Application.objects.filter(job__in=jobs).values_list('pk', flat=True)
+                self.assertEqual(set(found), expected)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class JobSearchAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_jobs', stdout=StringIO())
+        call_command('populate_jobs', users=10, jobs=60, applications=60, bookmarks=40, stdout=StringIO())
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_changelist_search(self):
+        self.client.force_login(self.admin_user)
+        models = [model for model, model_admin in admin.site._registry.items() if isinstance(model_admin, JobSearchAdmin)]
+        self.assertTrue(models)
+        for model in models:
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            for term in ('python', 'admin', 'no-such-term'):
+                with self.subTest(model=model.__name__, term=term):
+                    response = self.client.get(url, {'q': term})
+                    self.assertEqual(response.status_code, 200)
+            # Full-text matches are listed
+            response = self.client.get(url, {'q': 'python'})
+            self.assertGreater(response.context['cl'].result_count, 0, model.__name__)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'jobs_cache'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jobs-local-test'},
+})
+class ReplicaRouterTests(TransactionTestCase):
+    # Not TestCase: reads inside its transaction always stay on the primary
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        # A replica to route to; the test database has none
+        patcher = mock.patch('jobs.replicas.replica_aliases', return_value=['replica_1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = replicas.ReplicaRouter()
+        self.cache_model = caches['default'].cache_model_class
+
+    def request(self, view):
+        return ReplicaMiddleware(replicas.read_replica(view))(RequestFactory().get('/'))
+
+    def test_cache_writes_do_not_pin(self):
+        def view(request):
+            caches['default'].set('replica-test', 1)
+            # Cache reads go to the primary, job reads to the replica
+            routes = (self.router.db_for_read(self.cache_model), self.router.db_for_read(Job))
+            return HttpResponse(' '.join(routes))
+
+        response = self.request(view)
+        self.assertEqual(response.content.decode(), 'default replica_1')
+        self.assertNotIn(replicas.STICKY_COOKIE, response.cookies)
+
+    def test_writes_pin_to_primary(self):
+        def view(request):
+            Company.objects.create(name='Pinned', location='Remote', description='-', email='a@example.com')
+            return HttpResponse(self.router.db_for_read(Job))
+
+        response = self.request(view)
+        self.assertEqual(response.content.decode(), 'default')
+        self.assertIn(replicas.STICKY_COOKIE, response.cookies)
+
+
+class CacheCheckTests(TestCase):
+    @mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'})
+    def test_shared_cache_with_several_workers(self):
+        for backend, errors in (('redis', []), ('db', []), ('locmem', ['jobs.E001'])):
+            with self.subTest(backend=backend), self.settings(CACHE_BACKEND=backend, VIEW_COUNTER_BACKEND='local'):
+                self.assertEqual([error.id for error in checks.check_shared_cache(None)], errors)
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = make_company()
+        cls.jobs = [make_job(cls.company, title=f'Job {number}') for number in range(3)]
+
+    def setUp(self):
+        # A counter of its own, flushed only when a test asks
+        self.counter = counters.ViewCounter(counters.LocalStore(), interval=3600, max_pending=1000)
+        patcher = mock.patch.object(counters, '_counter', self.counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def views(self, job):
+        return Job.objects.values_list('views_count', flat=True).get(pk=job.pk)
+
+    def test_increment_views_buffers(self):
+        job = self.jobs[0]
+        for _ in range(3):
+            job.increment_views()
+        self.assertEqual(job.views_count, 3)
+        self.assertEqual(self.views(job), 0)
+        self.assertEqual(self.counter.store.pending(), 1)
+
+    def test_flush_applies_deltas(self):
+        for job, views in zip(self.jobs, (3, 1, 0)):
+            for _ in range(views):
+                job.increment_views()
+        self.assertEqual(counters.flush(), 2)
+        self.assertEqual([self.views(job) for job in self.jobs], [3, 1, 0])
+        self.assertEqual(CompanyStats.objects.get(company=self.company).total_views, 4)
+        self.assertEqual(JobDailyViews.objects.get(job=self.jobs[0]).views, 3)
+        self.assertEqual(counters.flush(), 0)
+        self.assertEqual(self.views(self.jobs[0]), 3)
+
+    def test_failed_flush_loses_no_counts(self):
+        for job in self.jobs:
+            job.increment_views()
+            job.increment_views()
+        record = leaderboards.record_daily_views
+        calls = []
+
+        def fail_second_batch(job_counts):
+            calls.append(job_counts)
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            record(job_counts)
+
+        with mock.patch.object(counters, 'UPDATE_BATCH_SIZE', 1), \
+                mock.patch.object(leaderboards, 'record_daily_views', fail_second_batch), \
+                self.assertLogs('jobs.counters', 'ERROR'):
+            # The first batch commits; the failed one and the rest are kept
+            self.assertEqual(counters.flush(), 1)
+        self.assertEqual([self.views(job) for job in self.jobs], [2, 0, 0])
+        self.assertEqual(self.counter.store.pending(), 2)
+
+        self.assertEqual(counters.flush(), 2)
+        self.assertEqual([self.views(job) for job in self.jobs], [2, 2, 2])
+        self.assertEqual(CompanyStats.objects.get(company=self.company).total_views, 6)
+
+    def test_cache_store(self):
+        store = counters.CacheStore()
+        store.add(self.jobs[0].pk)
+        store.add(self.jobs[0].pk)
+        store.add(self.jobs[1].pk)
+        self.assertEqual(store.drain(), {self.jobs[0].pk: 2, self.jobs[1].pk: 1})
+        self.assertEqual(store.drain(), {})
+
+
+class FacetCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = make_company()
+        cls.job = make_job(cls.company, job_type='Contract', location='Berlin')
+        make_job(cls.company, title='Data Engineer', location='Berlin')
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        facets.get_counts()  # Cached, so the changes below adjust it in place
+
+    def assertCountsMatch(self):
+        self.assertIsNotNone(facets._cache.get('counts', use_local=False), 'counts were dropped, not updated')
+        self.assertEqual(facets.get_counts(), facets.compute_counts())
+
+    def test_create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_job(self.company, title='Go Developer', location='Lisbon', experience_level='Senior')
+        self.assertCountsMatch()
+        self.assertEqual(facets.get_counts()['location']['Lisbon'], 1)
+
+    def test_deactivate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job.is_active = False
+            self.job.save()
+        self.assertCountsMatch()
+        self.assertNotIn('Contract', facets.get_counts()['job_type'])
+
+    def test_location_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = Job.objects.get(pk=self.job.pk)
+            job.location = 'Paris'
+            job.save(update_fields=['location'])
+        self.assertCountsMatch()
+        self.assertEqual(facets.get_counts()['location'], {'Berlin': 1, 'Paris': 1})
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Job.objects.get(pk=self.job.pk).delete()
+        self.assertCountsMatch()
+        self.assertEqual(facets.get_counts()['location'], {'Berlin': 1})
+
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        for number in range(11):
+            make_job(company, title=f'Python Developer {number % 2}')
+        # Ties on the leading key: only the id tells rows apart
+        Job.objects.update(posted_date=datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc))
+        cls.ordering = ('-posted_date', '-id')
+        cls.expected = list(Job.objects.order_by(*cls.ordering).values_list('pk', flat=True))
+
+    def setUp(self):
+        clear_caches()
+
+    def walk(self, paginator):
+        """Every page forwards, then back again from the last one"""
+        forwards, pages, cursor = [], [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([job.pk for job in page])
+            forwards += pages[-1]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        backwards = []
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backwards.append([job.pk for job in page])
+        return forwards, pages, backwards
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPaginator(Job.objects.all(), 4, self.ordering)
+        job = Job.objects.order_by(*self.ordering)[3]
+        self.assertEqual(paginator.decode_cursor(paginator.encode_cursor(job, 'next')), ('next', [job.posted_date, job.pk]))
+
+    def test_ties_have_no_duplicates_or_gaps(self):
+        forwards, pages, backwards = self.walk(KeysetPaginator(Job.objects.all(), 4, self.ordering))
+        self.assertEqual(forwards, self.expected)
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_search_rank_ties(self):
+        jobs = search.filter_jobs(Job.objects.all(), 'python developer')
+        ranked = list(jobs.order_by('search_rank', '-id').values_list('pk', flat=True))
+        self.assertEqual(len(ranked), 11)
+        forwards, pages, backwards = self.walk(KeysetPaginator(jobs, 3, ('search_rank', '-id')))
+        self.assertEqual(forwards, ranked)
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_bad_cursors_give_the_first_page(self):
+        paginator = KeysetPaginator(search.filter_jobs(Job.objects.all(), 'python'), 4, ('search_rank', '-id'))
+        first = [job.pk for job in paginator.page()]
+        cursors = [
+            'not a cursor', '!!!', _cursor([1, 2]), _cursor({'d': 'next'}), _cursor({'d': 'up', 'k': [1.0, 1]}),
+            _cursor({'d': 'next', 'k': [1.0]}), _cursor({'d': 'next', 'k': None}),
+            _cursor({'d': 'next', 'k': [None, 1]}), _cursor({'d': 'next', 'k': ['-1', 1]}),
+            _cursor({'d': 'next', 'k': [True, 1]}), _cursor({'d': 'next', 'k': [1.0, 'x']}),
+            _cursor({'d': 'next', 'k': [1.0, None]}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+                self.assertEqual([job.pk for job in paginator.get_page(cursor)], first)
+                for params in ({'cursor': cursor}, {'cursor': cursor, 'search': 'python'}):
+                    self.assertEqual(self.client.get(reverse('jobs:index'), params).status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=['*'], PAGE_CACHE_TIMEOUTS={'index': 60, 'job_detail': 60, 'company_detail': 60})
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = make_company()
+        cls.job = make_job(cls.company)
+        cls.user = User.objects.create_user('seeker', 'seeker@example.com', 'password')
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        self.addCleanup(counters.flush)
+
+    def test_anonymous_pages_are_cached(self):
+        for url in (reverse('jobs:index'), reverse('jobs:job_detail', args=[self.job.pk]),
+                    reverse('jobs:company_detail', args=[self.company.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                self.assertContains(response, self.job.title)
+
+    def test_etag_revalidation(self):
+        url = reverse('jobs:job_detail', args=[self.job.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_saving_a_job_purges_its_pages(self):
+        urls = [reverse('jobs:index'), reverse('jobs:job_detail', args=[self.job.pk]),
+                reverse('jobs:company_detail', args=[self.company.pk])]
+        for url in urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            job = Job.objects.get(pk=self.job.pk)
+            job.title = 'Rust Developer'
+            job.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'miss')
+                self.assertContains(response, 'Rust Developer')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        url = reverse('jobs:job_detail', args=[self.job.pk])
+        self.client.get(url)
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Page-Cache', response)
+
+
+PDF = b'%PDF-1.4\n' + b'resume ' * 100
+
+
+@override_settings(ALLOWED_HOSTS=['*'], RESUME_MAX_UPLOAD_SIZE=2048)
+class ResumeUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        cls.jobs = [make_job(company, title=f'Job {number}') for number in range(2)]
+        cls.user = User.objects.create_user('seeker', 'seeker@example.com', 'password')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = media_root
+        self.client.force_login(self.user)
+
+    def apply(self, job, name, content, client=None):
+        resume = SimpleUploadedFile(name, content, 'application/octet-stream')
+        return (client or self.client).post(reverse('jobs:apply_job', args=[job.pk]), {'resume': resume})
+
+    def stored(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def assertRejected(self, response, error):
+        self.assertContains(response, error)
+        self.assertFalse(Application.objects.exists())
+        self.assertEqual(self.stored(), [])
+
+    def test_oversize_upload(self):
+        self.assertRejected(self.apply(self.jobs[0], 'cv.pdf', PDF * 10), 'Resume must be smaller than')
+
+    def test_wrong_type(self):
+        self.assertRejected(self.apply(self.jobs[0], 'cv.txt', b'plain text'), 'Resume must be one of')
+        self.assertRejected(self.apply(self.jobs[0], 'cv.pdf', b'not a pdf at all'), 'does not match its extension')
+
+    def test_same_file_is_stored_once(self):
+        for job in self.jobs:
+            self.assertRedirects(self.apply(job, 'cv.pdf', PDF), reverse('jobs:my_applications'),
+                                 fetch_redirect_response=False)
+        names = set(Application.objects.values_list('resume', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(len(self.stored()), 1)
+
+    def test_csrf_is_still_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(self.apply(self.jobs[0], 'cv.pdf', PDF, client).status_code, 403)
+        self.assertFalse(Application.objects.exists())
+
+    def test_missing_resume_file_is_404(self):
+        self.apply(self.jobs[0], 'cv.pdf', PDF)
+        application = Application.objects.get()
+        url = reverse('jobs:download_resume', args=[application.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        os.remove(application.resume.path)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.email = outbox.enqueue('Hello', 'Body', ['a@example.com', 'b@example.com'])
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_date=timezone.now())
+
+    def fail_sending(self):
+        return mock.patch('jobs.outbox.EmailMessage.send', side_effect=smtplib.SMTPException('mailbox full'))
+
+    def test_send(self):
+        self.assertEqual(outbox.send_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com', 'b@example.com'])
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), ('Sent', 1))
+        self.assertIsNotNone(self.email.sent_date)
+        self.assertEqual(outbox.send_batch(), (0, 0))
+
+    def test_failure_is_retried_after_backoff(self):
+        with self.fail_sending(), self.assertLogs('jobs.outbox', 'WARNING'):
+            self.assertEqual(outbox.send_batch(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts, self.email.last_error), ('Pending', 1, 'mailbox full'))
+        self.assertAlmostEqual(
+            (self.email.next_attempt_date - timezone.now()).total_seconds(), 60, delta=5,
+        )
+        # Not due yet
+        self.assertEqual(outbox.send_batch(), (0, 0))
+
+        self.make_due()
+        self.assertEqual(outbox.send_batch(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), ('Sent', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        with self.fail_sending(), self.assertLogs('jobs.outbox', 'WARNING'):
+            for _ in range(3):
+                self.make_due()
+                self.assertEqual(outbox.send_batch(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), ('Failed', 3))
+        self.make_due()
+        self.assertEqual(outbox.send_batch(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_claimed_emails_are_leased(self):
+        self.assertEqual(outbox._claim(10), [self.email])
+        # Another worker finds nothing due until the lease runs out
+        self.assertEqual(outbox._claim(10), [])
+
+    def test_backoff_doubles_up_to_a_cap(self):
+        self.assertEqual([outbox.backoff(n).total_seconds() for n in (1, 2, 3)], [60, 120, 240])
+        self.assertEqual(outbox.backoff(50), timedelta(hours=6))
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class TriageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        cls.job = make_job(company)
+        cls.other_job = make_job(make_company('Other'))
+        cls.employer = User.objects.create_user('employer', 'employer@example.com', 'password')
+        # Through the profile the user holds: saving the user saves it too
+        profile = cls.employer.userprofile
+        profile.is_employer, profile.company = True, company
+        profile.save()
+        cls.applications = [
+            Application.objects.create(
+                job=cls.job, user=User.objects.create_user(f'seeker{number}', f'seeker{number}@example.com'),
+                resume='resumes/cv.pdf', status=status,
+            )
+            for number, status in enumerate(['Applied', 'Applied', 'Reviewed', 'Shortlisted'])
+        ]
+        cls.foreign = Application.objects.create(
+            job=cls.other_job, user=User.objects.get(username='seeker0'), resume='resumes/cv.pdf',
+        )
+
+    def audit(self):
+        return sorted(ApplicationStatusChange.objects.values_list('application_id', 'old_status', 'new_status'))
+
+    def test_one_audit_row_per_changed_application(self):
+        changed = triage.change_status(Application.objects.filter(job=self.job), 'Reviewed', changed_by=self.employer)
+        self.assertEqual(changed, 3)
+        first, second, reviewed, shortlisted = self.applications
+        # Already Reviewed: skipped, no audit row and no email
+        self.assertEqual(self.audit(), [
+            (first.pk, 'Applied', 'Reviewed'), (second.pk, 'Applied', 'Reviewed'),
+            (shortlisted.pk, 'Shortlisted', 'Reviewed'),
+        ])
+        self.assertEqual(set(ApplicationStatusChange.objects.values_list('changed_by', flat=True)), {self.employer.pk})
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+        self.assertEqual(set(Application.objects.filter(job=self.job).values_list('status', flat=True)), {'Reviewed'})
+
+    def test_nothing_to_change(self):
+        self.assertEqual(triage.change_status(Application.objects.filter(pk=self.applications[2].pk), 'Reviewed'), 0)
+        self.assertEqual(self.audit(), [])
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_batch_limit_changes_nothing(self):
+        with self.assertRaises(triage.BatchTooLarge):
+            triage.change_status(Application.objects.all(), 'Rejected', limit=2)
+        self.assertEqual(self.audit(), [])
+
+    def test_view_only_changes_manageable_applications(self):
+        self.client.force_login(self.employer)
+        self.client.post(reverse('jobs:change_application_status'), {
+            'status': 'Interview', 'applications': [self.applications[0].pk, self.foreign.pk],
+        })
+        self.assertEqual(self.audit(), [(self.applications[0].pk, 'Applied', 'Interview')])
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'Applied')
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        cls.job = make_job(company)
+        cls.employer = User.objects.create_user('employer', 'employer@example.com', 'password')
+        profile = cls.employer.userprofile
+        profile.is_employer, profile.company = True, company
+        profile.save()
+        names = [('=HYPERLINK("http://evil")', 'Smith'), ('Ann', 'O"Brien, Jr'), ('Bob', '-1')]
+        for number, (first_name, last_name) in enumerate(names):
+            user = User.objects.create_user(
+                f'seeker{number}', f'seeker{number}@example.com', first_name=first_name, last_name=last_name,
+            )
+            Application.objects.create(job=cls.job, user=user, resume='resumes/cv.pdf')
+        # Another company's applicant is never exported
+        Application.objects.create(job=make_job(make_company('Other')), user=user, resume='resumes/cv.pdf')
+
+    def setUp(self):
+        self.client.force_login(self.employer)
+
+    def export(self, export_format):
+        response = self.client.get(reverse('jobs:export_employer_applications'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        header, *rows = csv.reader(StringIO(self.export('csv')))
+        self.assertEqual(tuple(header), exports.COLUMNS)
+        self.assertEqual(len(rows), 3)
+        names = [(row[header.index('first_name')], row[header.index('last_name')]) for row in rows]
+        # Formulas are defused, quotes and commas survive the round trip
+        self.assertEqual(names, [("'=HYPERLINK(\"http://evil\")", 'Smith'), ('Ann', 'O"Brien, Jr'), ('Bob', "'-1")])
+        self.assertTrue(all(row[-1].startswith('http://testserver/') for row in rows))
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(rows), 3)
+        # No spreadsheet reads it: values are left as they are
+        self.assertEqual(rows[0]['first_name'], '=HYPERLINK("http://evil")')
+        self.assertEqual({row['job_id'] for row in rows}, {self.job.pk})
+
+    def test_unknown_format_and_non_employers(self):
+        response = self.client.get(reverse('jobs:export_employer_applications'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(User.objects.get(username='seeker0'))
+        response = self.client.get(reverse('jobs:export_employer_applications'))
+        self.assertEqual(response.status_code, 403)
+
+
+class BookmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        cls.jobs = [make_job(company, f'Job {number}') for number in range(3)]
+        cls.user = User.objects.create_user('seeker', 'seeker@example.com', 'password')
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('jobs:bulk_bookmarks'), body if isinstance(body, str) else json.dumps(body),
+                content_type='application/json',
+            )
+
+    def bookmarked(self):
+        jobs = user_jobs.mark(Job.objects.order_by('pk'), self.user)
+        return [job.pk for job in jobs if job.is_bookmarked]
+
+    def test_invalid_payloads_change_nothing(self):
+        first = self.jobs[0].pk
+        for body in ['not json', '[1]', {'add': first}, {'add': ['1']}, {'add': [first], 'remove': [first]},
+                     {'add': list(range(1, 102))}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertFalse(Bookmark.objects.exists())
+        self.assertEqual(self.bookmarked(), [])
+
+    def test_add_and_remove(self):
+        first, second, third = (job.pk for job in self.jobs)
+        # Loads the user's sets into the cache, which the changes then update
+        self.assertEqual(self.bookmarked(), [])
+        response = self.post({'add': [first, second, 999999]})
+        self.assertEqual(response.json(), {'bookmarks': {str(first): True, str(second): True}})
+        self.assertEqual(self.bookmarked(), [first, second])
+
+        response = self.post({'add': [third], 'remove': [first]})
+        self.assertEqual(response.json(), {'bookmarks': {str(third): True, str(first): False}})
+        self.assertEqual(self.bookmarked(), [second, third])
+        # The cached sets match the table
+        self.assertEqual(sorted(Bookmark.objects.values_list('job_id', flat=True)), [second, third])
+
+
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = make_company()
+        cls.jobs = [make_job(company, f'Job {number}', views_count=number * 10) for number in range(4)]
+
+    def setUp(self):
+        clear_caches()
+
+    def popular(self):
+        return [job.pk for job in leaderboards.popular()]
+
+    def test_order_after_views(self):
+        first, second, third, fourth = (job.pk for job in self.jobs)
+        leaderboards.record_daily_views({first: 5, second: 20, third: 10})
+        # Older views count for less
+        leaderboards.record_daily_views({fourth: 12}, day=timezone.now().date() - timedelta(days=3))
+        leaderboards.rebuild()
+        self.assertEqual(self.popular(), [second, third, first, fourth])
+
+        # Views since the rebuild move a job up without one
+        leaderboards.add_views({first: 30})
+        self.assertEqual(self.popular(), [first, second, third, fourth])
+        response = self.client.get(reverse('jobs:leaderboards_api'), {'limit': 2})
+        self.assertEqual([job['id'] for job in response.json()['popular']], [first, second])
+
+    def test_inactive_jobs_are_left_out(self):
+        first, second = self.jobs[0].pk, self.jobs[1].pk
+        leaderboards.record_daily_views({first: 5, second: 20})
+        Job.objects.filter(pk=second).update(is_active=False)
+        leaderboards.rebuild()
+        self.assertEqual(self.popular(), [first])
+
+    def test_warm_cache_seeds_daily_views(self):
+        first, second, third, fourth = (job.pk for job in self.jobs)
+        with override_settings(ALLOWED_HOSTS=['*']):
+            call_command('warm_cache', stdout=StringIO())
+        # By lifetime views; the job without views is left out
+        self.assertEqual(self.popular(), [fourth, third, second])
+        self.assertEqual(JobDailyViews.objects.count(), 3)
+        # Only while the window holds no views
+        self.assertEqual(leaderboards.seed_daily_views(), 0)
+
+
+class RequestLogTests(TestCase):
+    def test_request_line_only_at_debug(self):
+        with self.assertNoLogs('jobs.metrics', 'INFO'):
+            self.client.get(reverse('jobs:index'))
+        with self.assertLogs('jobs.metrics', 'DEBUG') as logs:
+            self.client.get(reverse('jobs:index'))
+        self.assertIn('view=jobs:index method=GET status=200', logs.output[0])
@@ -0,0 +1,114 @@
+"""
+Bulk application status changes for employer triage.
+
+``change_status`` moves any number of applications to one status in a single
+UPDATE, records an ``ApplicationStatusChange`` for each with one bulk_create
+and queues the applicants' emails in the outbox with another, all in one
+transaction. Applications aren't saved one by one, so no Application signals
+are sent; nothing listens for status changes.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import outbox
+from .models import Application, ApplicationStatusChange, UserProfile
+
+STATUSES = dict(Application.STATUS_CHOICES)
+
+# Most applications one employer request may change
+MAX_BATCH = 1000
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def manageable_applications(user):
+    """Applications user may triage: staff all, others those of jobs they posted or of their company"""
+    applications = Application.objects.all()
+    if user.is_staff:
+        return applications
+    allowed = Q(job__posted_by=user)
+    company_id = (
+        UserProfile.objects.filter(user=user, is_employer=True)
+        .values_list('company_id', flat=True).first()
+    )
+    if company_id is not None:
+        allowed |= Q(job__company_id=company_id)
+    return applications.filter(allowed)
+
+
+def employer_company(user):
+    """The company user is an employer at, or None"""
+    profile = (
+        UserProfile.objects.filter(user=user, is_employer=True).exclude(company=None)
+        .select_related('company').first()
+    )
+    return profile.company if profile else None
+
+
+def can_manage_job(user, job):
+    """True if user may triage job's applicants"""
+    if user.is_staff or job.posted_by_id == user.pk:
+        return True
+    return UserProfile.objects.filter(user=user, is_employer=True, company_id=job.company_id).exists()
+
+
+def _notification(email, name, job_title, company_name, status):
+    subject = f'Your application for {job_title}: {STATUSES[status]}'
+    body = f"""
+Hi {name},
+
+The status of your application for {job_title} at {company_name} is now: {STATUSES[status]}.
+
+You can follow all your applications in your dashboard.
+
+Best regards,
+Job Portal Team
+    """
+    return subject, body, [email]
+
+
+def change_status(applications, status, changed_by=None, limit=None):
+    """
+    Move applications (a queryset) to status; returns how many changed.
+    Raises BatchTooLarge, changing nothing, if more than limit would change.
+    """
+    if status not in STATUSES:
+        raise ValueError(f'Unknown application status: {status!r}')
+
+    with transaction.atomic():
+        # Locked in id order, so two overlapping batches can't deadlock
+        rows = (
+            applications.exclude(status=status).order_by('pk').select_for_update(of=('self',))
+            .values_list('pk', 'status', 'user__email', 'user__first_name', 'user__username',
+                         'job__title', 'job__company__name')
+        )
+        if limit is not None:
+            rows = rows[:limit + 1]
+        rows = list(rows)
+        if limit is not None and len(rows) > limit:
+            raise BatchTooLarge(limit)
+        if not rows:
+            return 0
+
+        Application.objects.filter(pk__in=[row[0] for row in rows]).update(
+            status=status, updated_date=timezone.now(),  # update() skips auto_now
+        )
+        ApplicationStatusChange.objects.bulk_create(
+            [
+                ApplicationStatusChange(
+                    application_id=pk, old_status=old_status, new_status=status, changed_by=changed_by,
+                )
+                for pk, old_status, *_ in rows
+            ],
+            batch_size=500,
+        )
+        # Sent later by send_queued_emails, not during this request
+        outbox.enqueue_many(
+            _notification(email, first_name or username, job_title, company_name, status)
+            for _, _, email, first_name, username, job_title, company_name in rows
+            if email
+        )
+    return len(rows)
@@ -27,5 +27,19 @@ urlpatterns = [
     
     # Job Application
     path('apply/<int:pk>/', views.apply_job, name='apply_job'),
+    path('application/<int:pk>/resume/', views.download_resume, name='download_resume'),
     path('job/<int:pk>/bookmark/', views.toggle_bookmark, name='toggle_bookmark'),
+    
+    # Employer Triage
+    path('job/<int:pk>/applicants/', views.job_applicants, name='job_applicants'),
+    path('applications/status/', views.change_application_status, name='change_application_status'),
+    path('employer/applications/', views.employer_applications, name='employer_applications'),
+    path('employer/applications/export/', views.export_employer_applications, name='export_employer_applications'),
+    
+    # JSON
+    path('api/bookmarks/', views.bulk_bookmarks, name='bulk_bookmarks'),
+    path('api/leaderboards/', views.leaderboards_api, name='leaderboards_api'),
+    
+    # Monitoring
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
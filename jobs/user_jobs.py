@@ -0,0 +1,105 @@
+"""
+The jobs each user has bookmarked and applied to, for marking listing cards.
+
+A user's job ids are kept in the two-tier cache (jobs.caching) as sorted
+arrays of 64-bit ints, 8 bytes a job, loaded with one query when missing and
+changed in place when the user bookmarks, unbookmarks or applies. Listing
+pages mark all their cards from them instead of querying per job:
+
+    user_jobs.mark(jobs_page.object_list, request.user)
+    # job.is_bookmarked, job.has_applied on every job
+
+Reads skip the in-process copy, so a change shows on the next page in every
+worker.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+
+from .caching import Namespace
+from .models import Application, Bookmark
+
+BOOKMARKED = 'bookmarked'
+APPLIED = 'applied'
+KINDS = (BOOKMARKED, APPLIED)
+
+
+def _timeout():
+    return getattr(settings, 'USER_JOBS_CACHE_TIMEOUT', 3600)
+
+
+_cache = Namespace('user-jobs', timeout=_timeout)
+
+
+def _load(user_id):
+    """Both id arrays of a user, in one query"""
+    rows = (
+        Bookmark.objects.filter(user_id=user_id).order_by()
+        .annotate(kind=Value(BOOKMARKED)).values_list('kind', 'job_id')
+        .union(
+            Application.objects.filter(user_id=user_id).order_by()
+            .annotate(kind=Value(APPLIED)).values_list('kind', 'job_id'),
+            all=True,
+        )
+    )
+    ids = {kind: [] for kind in KINDS}
+    for kind, job_id in rows:
+        ids[kind].append(job_id)
+    return {kind: array('q', sorted(set(job_ids))) for kind, job_ids in ids.items()}
+
+
+def _get(user_id):
+    sets = _cache.get(user_id, use_local=False)
+    if sets is None:
+        sets = _load(user_id)
+        _cache.set(user_id, sets)
+    return sets
+
+
+def get(user):
+    """``{'bookmarked': frozenset(job ids), 'applied': frozenset(job ids)}``"""
+    if not user.is_authenticated:
+        return {kind: frozenset() for kind in KINDS}
+    return {kind: frozenset(job_ids) for kind, job_ids in _get(user.pk).items()}
+
+
+def mark(jobs, user):
+    """Set is_bookmarked and has_applied on each of jobs for user"""
+    sets = get(user)
+    for job in jobs:
+        job.is_bookmarked = job.pk in sets[BOOKMARKED]
+        job.has_applied = job.pk in sets[APPLIED]
+    return jobs
+
+
+def _change(user_id, kind, add=(), remove=()):
+    def change(sets):
+        job_ids = sets[kind]
+        for job_id in add:
+            index = bisect_left(job_ids, job_id)
+            if index == len(job_ids) or job_ids[index] != job_id:
+                job_ids.insert(index, job_id)
+        for job_id in remove:
+            index = bisect_left(job_ids, job_id)
+            if index < len(job_ids) and job_ids[index] == job_id:
+                del job_ids[index]
+        return sets
+
+    # Only once committed, so a rolled back change never shows
+    transaction.on_commit(lambda: _cache.update(user_id, change))
+
+
+def add(user_id, kind, job_ids):
+    _change(user_id, kind, add=job_ids)
+
+
+def remove(user_id, kind, job_ids):
+    _change(user_id, kind, remove=job_ids)
+
+
+def invalidate(user_id):
+    """Drop a user's sets; they are reloaded on their next listing page"""
+    transaction.on_commit(lambda: _cache.delete(user_id))
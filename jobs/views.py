@@ -1,32 +1,51 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from .models import Job, Company, Application, Bookmark, UserProfile
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.text import slugify
+from . import (
+    counters, exports, facets, fragments, leaderboards, metrics, outbox, resumes, search, stats, triage, user_jobs,
+)
+from .page_cache import cache_anonymous_page
+from .pagination import KeysetPaginator
+from .querybudget import query_budget
+from .replicas import read_replica
 from .forms import JobForm, CustomUserCreationForm, UserLoginForm
 
 
 # ==================== Home & Search Views ====================
 
-def index(request):
+@query_budget(4)
+@cache_anonymous_page('index', params=(
+    'search', 'job_type', 'experience', 'location', 'min_salary', 'max_salary', 'cursor',
+))
+@read_replica
+async def index(request):
     """Display job portal homepage with search and filters"""
     jobs = Job.objects.filter(is_active=True).select_related('company')
     
-    # Search functionality
+    # Search functionality (full-text index, ranked by relevance)
     search_query = request.GET.get('search', '')
     if search_query:
-        jobs = jobs.filter(
-            Q(title__icontains=search_query) |
-            Q(company__name__icontains=search_query) |
-            Q(location__icontains=search_query)
-        )
+        jobs = search.filter_jobs(jobs, search_query)
     
     # Filter by job type
     job_type = request.GET.get('job_type', '')
@@ -51,84 +70,114 @@ def index(request):
     if max_salary:
         jobs = jobs.filter(salary_max__lte=int(max_salary))
     
-    # Pagination
-    paginator = Paginator(jobs, 6)  # 6 jobs per page
-    page_number = request.GET.get('page', 1)
-    jobs_page = paginator.get_page(page_number)
-    
-    # Get available filters for the form
-    job_types = Job.objects.values_list('job_type', flat=True).distinct()
-    experience_levels = Job.objects.values_list('experience_level', flat=True).distinct()
-    locations = Job.objects.values_list('location', flat=True).distinct()
+    # Pagination (keyset: relevance for searches, newest first otherwise)
+    ordering = ('search_rank', '-id') if search_query else ('-posted_date', '-id')
+    paginator = KeysetPaginator(jobs, 6, ordering)  # 6 jobs per page
+    
+    # The page, its total and the filters (with active job counts) for the form
+    jobs_page, _, filter_facets, trending_jobs = await asyncio.gather(
+        paginator.aget_page(request.GET.get('cursor')),
+        paginator.acount(),
+        facets.aget_facets(),
+        leaderboards.apopular(5),
+    )
+    await sync_to_async(fragments.attach_versions)(jobs_page.object_list)
+    # Bookmarked/applied marks on the cards, from the user's cached job sets
+    request.user = await request.auser()
+    await sync_to_async(user_jobs.mark)(jobs_page.object_list, request.user)
     
     context = {
         'jobs': jobs_page,
         'search_query': search_query,
-        'job_types': job_types,
-        'experience_levels': experience_levels,
-        'locations': locations,
+        'job_types': filter_facets['job_type'],
+        'experience_levels': filter_facets['experience_level'],
+        'locations': filter_facets['location'],
+        'trending_jobs': trending_jobs,
         'selected_type': job_type,
         'selected_experience': experience,
         'selected_location': location,
     }
-    return render(request, 'jobs/index.html', context)
+    # Off the event loop: template fragments read the cache, which may be the database
+    return await sync_to_async(render)(request, 'jobs/index.html', context)
 
 
 # ==================== Job Detail View ====================
 
-def job_detail(request, pk):
+def _job_detail_dependencies(request, pk):
+    company_id = Job.objects.filter(pk=pk).values_list('company_id', flat=True).first()
+    return [f'job:{pk}', f'company:{company_id}']
+
+
+def _record_cached_job_view(request, pk):
+    counters.record_view(pk)
+
+
+@query_budget(4)
+@cache_anonymous_page('job_detail', dependencies=_job_detail_dependencies, on_hit=_record_cached_job_view)
+@read_replica
+async def job_detail(request, pk):
     """Display individual job details"""
-    job = get_object_or_404(Job, pk=pk, is_active=True)
-    job.increment_views()  # Track view count
-    
-    # Check if user has bookmarked
-    is_bookmarked = False
-    has_applied = False
-    
+    jobs = Job.objects.select_related('company')
     if request.user.is_authenticated:
-        is_bookmarked = Bookmark.objects.filter(user=request.user, job=job).exists()
-        has_applied = Application.objects.filter(user=request.user, job=job).exists()
+        # Bookmark/applied checks as subqueries of the job query
+        jobs = jobs.annotate(
+            is_bookmarked=Exists(Bookmark.objects.filter(user=request.user, job=OuterRef('pk'))),
+            has_applied=Exists(Application.objects.filter(user=request.user, job=OuterRef('pk'))),
+        )
+    job = await aget_object_or_404(jobs, pk=pk, is_active=True)
     
-    # Get other jobs from same company
-    related_jobs = job.company.jobs.filter(is_active=True).exclude(pk=pk)[:3]
+    # Other jobs from same company (cached per company); the view is only
+    # buffered here and written after the response
+    related_jobs, _, _ = await asyncio.gather(
+        stats.arelated_jobs(job),
+        sync_to_async(job.increment_views)(),
+        sync_to_async(fragments.attach_versions)([job]),
+    )
     
     context = {
         'job': job,
         'company': job.company,
-        'is_bookmarked': is_bookmarked,
-        'has_applied': has_applied,
+        'is_bookmarked': getattr(job, 'is_bookmarked', False),
+        'has_applied': getattr(job, 'has_applied', False),
         'related_jobs': related_jobs,
     }
-    return render(request, 'jobs/job_detail.html', context)
+    return await sync_to_async(render)(request, 'jobs/job_detail.html', context)
 
 
 # ==================== Company Profile View ====================
 
-def company_detail(request, pk):
+@query_budget(4)
+@cache_anonymous_page('company_detail', params=('cursor',),
+                      dependencies=lambda request, pk: [f'company:{pk}'])
+@read_replica
+async def company_detail(request, pk):
     """Display company profile with all jobs"""
-    company = get_object_or_404(Company, pk=pk)
-    jobs = company.jobs.filter(is_active=True)
-    
-    # Pagination
-    paginator = Paginator(jobs, 10)
-    page_number = request.GET.get('page', 1)
-    jobs_page = paginator.get_page(page_number)
-    
-    # Company stats
-    total_jobs = jobs.count()
-    total_applications = Application.objects.filter(job__company=company).count()
+    company = await aget_object_or_404(Company.objects.select_related('stats'), pk=pk)
+    jobs = Job.objects.filter(company=company, is_active=True)
+    
+    # Pagination, and company stats (denormalized, see jobs.stats)
+    paginator = KeysetPaginator(jobs, 10, ('-posted_date', '-id'))
+    jobs_page, company_stats, company.fragment_version = await asyncio.gather(
+        paginator.aget_page(request.GET.get('cursor')),
+        sync_to_async(stats.get_company_stats)(company),
+        sync_to_async(fragments.get_version)('company', company.pk),
+    )
+    await sync_to_async(fragments.attach_versions)(jobs_page.object_list)
+    request.user = await request.auser()
+    await sync_to_async(user_jobs.mark)(jobs_page.object_list, request.user)
     
     context = {
         'company': company,
         'jobs': jobs_page,
-        'total_jobs': total_jobs,
-        'total_applications': total_applications,
+        'total_jobs': company_stats.active_jobs,
+        'total_applications': company_stats.total_applications,
     }
-    return render(request, 'jobs/company_detail.html', context)
+    return await sync_to_async(render)(request, 'jobs/company_detail.html', context)
 
 
 # ==================== Authentication Views ====================
 
+@query_budget(2)
 @require_http_methods(["GET", "POST"])
 def register(request):
     """User registration view with form validation"""
@@ -153,6 +202,7 @@ def register(request):
     return render(request, 'jobs/register.html', context)
 
 
+@query_budget(2)
 @require_http_methods(["GET", "POST"])
 def user_login(request):
     """User login view with form validation"""
@@ -178,6 +228,7 @@ def user_login(request):
     return render(request, 'jobs/login.html', context)
 
 
+@query_budget(2)
 @login_required(login_url='jobs:login')
 def user_logout(request):
     """User logout view"""
@@ -187,7 +238,9 @@ def user_logout(request):
 
 # ==================== User Dashboard Views ====================
 
+@query_budget(3)
 @login_required(login_url='jobs:login')
+@read_replica
 def my_applications(request):
     """View user's job applications"""
     applications = Application.objects.filter(user=request.user).select_related('job', 'job__company')
@@ -198,9 +251,8 @@ def my_applications(request):
         applications = applications.filter(status=status_filter)
     
     # Pagination
-    paginator = Paginator(applications, 10)
-    page_number = request.GET.get('page', 1)
-    apps_page = paginator.get_page(page_number)
+    paginator = KeysetPaginator(applications, 10, ('-applied_date', '-id'))
+    apps_page = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'applications': apps_page,
@@ -210,15 +262,16 @@ def my_applications(request):
     return render(request, 'jobs/my_applications.html', context)
 
 
+@query_budget(3)
 @login_required(login_url='jobs:login')
+@read_replica
 def my_bookmarks(request):
     """View user's bookmarked jobs"""
     bookmarks = Bookmark.objects.filter(user=request.user).select_related('job', 'job__company')
     
     # Pagination
-    paginator = Paginator(bookmarks, 10)
-    page_number = request.GET.get('page', 1)
-    bookmarks_page = paginator.get_page(page_number)
+    paginator = KeysetPaginator(bookmarks, 10, ('-created_date', '-id'))
+    bookmarks_page = paginator.get_page(request.GET.get('cursor'))
     
     context = {'bookmarks': bookmarks_page}
     return render(request, 'jobs/my_bookmarks.html', context)
@@ -226,11 +279,22 @@ def my_bookmarks(request):
 
 # ==================== Application Views ====================
 
+@query_budget(4)
 @login_required(login_url='jobs:login')
 @require_http_methods(["GET", "POST"])
+@csrf_exempt
 def apply_job(request, pk):
     """Apply for a job with email notification"""
-    job = get_object_or_404(Job, pk=pk)
+    # Only this view checks and stores uploads as resumes. The handler has to
+    # be in place before the body is parsed, which the CSRF check would do,
+    # so that check runs after it instead
+    request.upload_handlers.insert(0, resumes.ResumeUploadHandler(request))
+    return _apply_job(request, pk)
+
+
+@csrf_protect
+def _apply_job(request, pk):
+    job = get_object_or_404(Job.objects.select_related('company'), pk=pk)
     
     # Check if already applied
     if Application.objects.filter(user=request.user, job=job).exists():
@@ -241,22 +305,30 @@ def apply_job(request, pk):
         resume = request.FILES.get('resume')
         cover_letter = request.POST.get('cover_letter', '')
         
+        upload_error = getattr(request, 'resume_upload_error', None)
+        if upload_error:
+            return render(request, 'jobs/apply.html', {'job': job, 'error': upload_error})
+        
         if not resume:
             messages.error(request, 'Resume is required.')
             return render(request, 'jobs/apply.html', {'job': job})
         
-        # Create application
-        application = Application.objects.create(
-            user=request.user,
-            job=job,
-            resume=resume,
-            cover_letter=cover_letter
-        )
+        # Content-addressed: a resume already on file is not stored again
+        resume_name = resumes.store_resume(resume)
         
-        # Send email notification to job poster
-        if job.posted_by and job.posted_by.email:
-            subject = f'New Application for {job.title}'
-            message = f"""
+        with transaction.atomic():
+            # Create application
+            application = Application.objects.create(
+                user=request.user,
+                job=job,
+                resume=resume_name,
+                cover_letter=cover_letter
+            )
+            
+            # Queue email notification to job poster (sent by send_queued_emails)
+            if job.posted_by and job.posted_by.email:
+                subject = f'New Application for {job.title}'
+                message = f"""
 Hi {job.posted_by.first_name or job.posted_by.username},
 
 A new applicant has applied for your job posting: {job.title}
@@ -268,17 +340,8 @@ You can view the application details in your dashboard.
 
 Best regards,
 Job Portal Team
-            """
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [job.posted_by.email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"Error sending email: {e}")
+                """
+                outbox.enqueue(subject, message, [job.posted_by.email])
         
         messages.success(request, 'Your application has been submitted successfully!')
         return redirect('jobs:my_applications')
@@ -286,8 +349,172 @@ Job Portal Team
     return render(request, 'jobs/apply.html', {'job': job})
 
 
+@query_budget(4)
+@login_required(login_url='jobs:login')
+def download_resume(request, pk):
+    """Download an applicant's resume - the applicant, the job's employer or staff"""
+    application = get_object_or_404(Application.objects.select_related('user', 'job'), pk=pk)
+    
+    userprofile = getattr(request.user, 'userprofile', None)
+    is_employer = (
+        userprofile is not None and userprofile.is_employer
+        and userprofile.company_id is not None
+        and userprofile.company_id == application.job.company_id
+    )
+    allowed = (
+        request.user.is_staff
+        or request.user == application.user
+        or request.user.pk == application.job.posted_by_id
+        or is_employer
+    )
+    if not allowed:
+        messages.error(request, 'You do not have access to this resume.')
+        return redirect('jobs:index')
+    
+    return resumes.resume_response(application)
+
+
+# ==================== Employer Triage Views ====================
+
+@query_budget(6)
+@login_required(login_url='jobs:login')
+@read_replica
+def job_applicants(request, pk):
+    """A job's applicants, with bulk status changes - its poster, employer or staff"""
+    job = get_object_or_404(Job.objects.select_related('company'), pk=pk)
+    if not triage.can_manage_job(request.user, job):
+        messages.error(request, 'You can only review applicants for your own jobs.')
+        return redirect('jobs:job_detail', pk=job.pk)
+    
+    applications = job.applications.select_related('user')
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        applications = applications.filter(status=status_filter)
+    
+    paginator = KeysetPaginator(applications, 25, ('-applied_date', '-id'))
+    apps_page = paginator.get_page(request.GET.get('cursor'))
+    
+    context = {
+        'job': job,
+        'applications': apps_page,
+        'status_choices': Application.STATUS_CHOICES,
+        'selected_status': status_filter,
+    }
+    return render(request, 'jobs/job_applicants.html', context)
+
+
+@query_budget(8)
+@login_required(login_url='jobs:login')
+@require_http_methods(["POST"])
+def change_application_status(request):
+    """Move the selected applications, or all of a job's with a status, to a new status"""
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('jobs:dashboard')
+    
+    status = request.POST.get('status', '')
+    if status not in triage.STATUSES:
+        messages.error(request, 'Choose a status to move the applications to.')
+        return redirect(next_url)
+    
+    applications = triage.manageable_applications(request.user)
+    try:
+        if request.POST.get('scope') == 'all':
+            # Every application of the job matching the page's filter
+            applications = applications.filter(job_id=int(request.POST['job']))
+            if request.POST.get('from_status'):
+                applications = applications.filter(status=request.POST['from_status'])
+        else:
+            applications = applications.filter(pk__in=[int(pk) for pk in request.POST.getlist('applications')])
+    except (KeyError, ValueError):
+        messages.error(request, 'Invalid selection.')
+        return redirect(next_url)
+    
+    try:
+        changed = triage.change_status(applications, status, changed_by=request.user, limit=triage.MAX_BATCH)
+    except triage.BatchTooLarge:
+        messages.error(request, f'At most {triage.MAX_BATCH} applications can be moved at once; filter them first.')
+        return redirect(next_url)
+    messages.success(request, f'{changed} application(s) moved to {triage.STATUSES[status]}.')
+    return redirect(next_url)
+
+
+def _inbox_applications(request, company):
+    """The company's applications, filtered by ?job= and ?status="""
+    applications = Application.objects.filter(job__company=company)
+    job_filter = request.GET.get('job', '')
+    if job_filter.isdigit():
+        applications = applications.filter(job_id=int(job_filter))
+    else:
+        job_filter = ''
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        applications = applications.filter(status=status_filter)
+    return applications, job_filter, status_filter
+
+
+@query_budget(6)
+@login_required(login_url='jobs:login')
+@read_replica
+def employer_applications(request):
+    """Applicant inbox: the applications to every job of the employer's company"""
+    company = triage.employer_company(request.user)
+    if company is None:
+        messages.error(request, 'The applicant inbox is for employers of a company.')
+        return redirect('jobs:dashboard')
+    
+    applications, job_filter, status_filter = _inbox_applications(request, company)
+    paginator = KeysetPaginator(applications.select_related('job', 'user'), 25, ('-applied_date', '-id'))
+    apps_page = paginator.get_page(request.GET.get('cursor'))
+    
+    context = {
+        'company': company,
+        'applications': apps_page,
+        'company_jobs': company.jobs.order_by('-posted_date').values_list('id', 'title'),
+        'status_choices': Application.STATUS_CHOICES,
+        'selected_job': job_filter,
+        'selected_status': status_filter,
+    }
+    return render(request, 'jobs/employer_applications.html', context)
+
+
+@query_budget(4)
+@login_required(login_url='jobs:login')
+@require_http_methods(["GET"])
+@read_replica
+def export_employer_applications(request):
+    """Stream the inbox's applications (same filters) as ?format=csv or ?format=ndjson"""
+    company = triage.employer_company(request.user)
+    if company is None:
+        return HttpResponseForbidden('The applicant export is for employers of a company.')
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.CONTENT_TYPES:
+        return HttpResponse('format must be csv or ndjson', status=400)
+    
+    applications, _, _ = _inbox_applications(request, company)
+    # In id order: an index scan streams from the first row without sorting.
+    # The database is picked now, as the rows are read after the view returns.
+    applications = applications.order_by('id')
+    applications = applications.using(applications.db)
+    
+    # Reversed once; per row it would take most of the export's time
+    resume_base = request.build_absolute_uri(reverse('jobs:download_resume', args=[0]))
+    
+    def resume_url(pk):
+        return resume_base.replace('/0/', f'/{pk}/', 1)
+    
+    stream = exports.astream if isinstance(request, ASGIRequest) else exports.stream
+    response = StreamingHttpResponse(
+        stream(applications, export_format, resume_url), content_type=exports.CONTENT_TYPES[export_format],
+    )
+    filename = f'applications-{slugify(company.name)}-{timezone.now():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ==================== Bookmark Views ====================
 
+@query_budget(5)
 @login_required(login_url='jobs:login')
 def toggle_bookmark(request, pk):
     """Toggle bookmark for a job"""
@@ -297,6 +524,7 @@ def toggle_bookmark(request, pk):
     
     if bookmark:
         bookmark.delete()
+        user_jobs.remove(request.user.pk, user_jobs.BOOKMARKED, [job.pk])
         is_bookmarked = False
     else:
         Bookmark.objects.create(user=request.user, job=job)
@@ -308,39 +536,118 @@ def toggle_bookmark(request, pk):
     return redirect('jobs:job_detail', pk=pk)
 
 
+# Most jobs one bookmarks request may change
+BOOKMARK_BATCH_LIMIT = 100
+
+
+def _job_ids(value):
+    """The set of job ids in a JSON list"""
+    if not isinstance(value, list) or any(type(job_id) is not int for job_id in value):
+        raise ValueError
+    return set(value)
+
+
+@query_budget(6)
+@login_required(login_url='jobs:login')
+@require_http_methods(["POST"])
+def bulk_bookmarks(request):
+    """Add and remove several bookmarks at once: {"add": [job ids], "remove": [job ids]}"""
+    try:
+        data = json.loads(request.body)
+        add = _job_ids(data.get('add', []))
+        remove = _job_ids(data.get('remove', []))
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'expected {"add": [job ids], "remove": [job ids]}'}, status=400)
+    if add & remove:
+        return JsonResponse({'error': 'a job cannot be both added and removed'}, status=400)
+    if len(add) + len(remove) > BOOKMARK_BATCH_LIMIT:
+        return JsonResponse({'error': f'at most {BOOKMARK_BATCH_LIMIT} jobs per request'}, status=400)
+    
+    with transaction.atomic():
+        # Unknown ids are left out rather than failing the whole batch
+        added = set(Job.objects.filter(pk__in=add).order_by().values_list('pk', flat=True)) if add else set()
+        if added:
+            Bookmark.objects.bulk_create(
+                [Bookmark(user=request.user, job_id=job_id) for job_id in added], ignore_conflicts=True,
+            )
+        if remove:
+            Bookmark.objects.filter(user=request.user, job_id__in=remove).delete()
+        # Neither sends signals
+        user_jobs.add(request.user.pk, user_jobs.BOOKMARKED, added)
+        user_jobs.remove(request.user.pk, user_jobs.BOOKMARKED, remove)
+    
+    # Known from what was applied, without reading the bookmarks back
+    state = {job_id: True for job_id in added}
+    state.update({job_id: False for job_id in remove})
+    return JsonResponse({'bookmarks': {str(job_id): value for job_id, value in state.items()}})
+
+
 # ==================== Analytics/Dashboard Views ====================
 
+@query_budget(3)
 @login_required(login_url='jobs:login')
-def dashboard(request):
+@read_replica
+async def dashboard(request):
     """User/Admin dashboard with analytics"""
-    user_stats = {
-        'applications_count': Application.objects.filter(user=request.user).count(),
-        'bookmarks_count': Bookmark.objects.filter(user=request.user).count(),
-        'applied_jobs': Application.objects.filter(user=request.user).values('status').annotate(count=Count('id')),
-    }
+    request.user = await request.auser()
     
-    # Popular jobs
-    popular_jobs = Job.objects.filter(is_active=True).order_by('-views_count')[:5]
-    
-    # Recent jobs
-    recent_jobs = Job.objects.filter(is_active=True).order_by('-posted_date')[:5]
+    # Per-user counts in one query; the shared leaderboards from the cache
+    user_stats, popular_jobs, recent_jobs = await asyncio.gather(
+        stats.aget_user_stats(request.user),
+        leaderboards.apopular(5),
+        leaderboards.arecent(5),
+    )
     
     context = {
         'user_stats': user_stats,
         'popular_jobs': popular_jobs,
         'recent_jobs': recent_jobs,
     }
-    return render(request, 'jobs/dashboard.html', context)
+    return await sync_to_async(render)(request, 'jobs/dashboard.html', context)
+
+
+def _leaderboard_entry(job):
+    return {
+        'id': job.pk,
+        'title': job.title,
+        'company': {'id': job.company_id, 'name': job.company.name},
+        'location': job.location,
+        'job_type': job.job_type,
+        'posted_date': job.posted_date.isoformat(),
+        'views_count': job.views_count,
+        'url': reverse('jobs:job_detail', args=[job.pk]),
+    }
+
+
+@query_budget(3)
+@require_http_methods(["GET"])
+@cache_control(public=True, max_age=30)
+@read_replica
+async def leaderboards_api(request):
+    """Trending and newest jobs as JSON; ?limit= up to LEADERBOARD_SIZE"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 5)), getattr(settings, 'LEADERBOARD_SIZE', 10)))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    popular_jobs, recent_jobs = await asyncio.gather(
+        leaderboards.apopular(limit),
+        leaderboards.arecent(limit),
+    )
+    return JsonResponse({
+        'popular': [_leaderboard_entry(job) for job in popular_jobs],
+        'recent': [_leaderboard_entry(job) for job in recent_jobs],
+    })
 
 
 # ==================== Job Creation & Editing Views ====================
 
+@query_budget(5)
 @login_required(login_url='jobs:login')
 @require_http_methods(["GET", "POST"])
 def create_job(request):
     """Create a new job posting - employers only"""
-    # Ensure user has a UserProfile
-    userprofile, created = UserProfile.objects.get_or_create(user=request.user)
+    # Ensure user has a UserProfile; the company is needed below
+    userprofile, created = UserProfile.objects.select_related('company').get_or_create(user=request.user)
     
     if not userprofile.is_employer:
         messages.error(request, 'Only employers can post jobs. Please contact support to upgrade your account.')
@@ -363,12 +670,13 @@ def create_job(request):
         form = JobForm()
         # Filter companies to only show user's company if they have one
         if userprofile.company:
-            form.fields['company'].queryset = Company.objects.filter(pk=userprofile.company.pk)
+            form.fields['company'].queryset = Company.objects.filter(pk=userprofile.company_id)
     
     context = {'form': form, 'title': 'Post a New Job'}
     return render(request, 'jobs/job_form.html', context)
 
 
+@query_budget(6)
 @login_required(login_url='jobs:login')
 @require_http_methods(["GET", "POST"])
 def edit_job(request, pk):
@@ -391,3 +699,18 @@ def edit_job(request, pk):
     
     context = {'form': form, 'title': 'Edit Job', 'job': job}
     return render(request, 'jobs/job_form.html', context)
+
+
+# ==================== Monitoring ====================
+
+@query_budget(0)
+def metrics_view(request):
+    """Request metrics of all workers in the Prometheus text format"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        # Not public by default: without a token only development servers show it
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')